@@ -0,0 +1,214 @@
+import json
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from cameras import WebCamera, RealSenseCamera, RecordingCamera, ReplayCamera
+from detector import YOLODetector
+from main import annotate_frame
+from utils import summarize
+
+
+def record(opt):
+    """从摄像头录制指定帧数"""
+    if opt.camera == 'realsense':
+        camera = RealSenseCamera(enable_depth=not opt.no_depth)
+    else:
+        camera = WebCamera(camera_id=opt.camera_id)
+    Path(opt.output).parent.mkdir(parents=True, exist_ok=True)
+    camera = RecordingCamera(camera, opt.output)
+    camera.start()
+    try:
+        while camera.frame_count < opt.frames:
+            camera.get_frame()
+    finally:
+        camera.stop()
+    print(f"已录制 {camera.frame_count} 帧到 {opt.output}")
+
+
+def run_pipeline(camera, detector: YOLODetector, max_frames: int = 0) -> Dict:
+    """
+    以main.py的处理流程（采集、检测、深度读取、翻转、绘制）运行，不显示窗口
+    Args:
+        camera: 已启动的摄像头
+        detector: 检测器
+        max_frames: 最多处理的帧数，0表示直到摄像头停止
+    Returns:
+        帧率和各阶段耗时统计
+    """
+    stages = {'capture': [], 'detect': [], 'annotate': [], 'total': []}
+    t_begin = time.perf_counter()
+    frames = 0
+    while camera.is_running and (not max_frames or frames < max_frames):
+        t0 = time.perf_counter()
+        frame = camera.get_frame()
+        if frame is None:
+            continue
+        t1 = time.perf_counter()
+        detections = detector.detect(frame)
+        t2 = time.perf_counter()
+        annotate_frame(detector, camera, frame, detections)
+        t3 = time.perf_counter()
+        stages['capture'].append((t1 - t0) * 1000)
+        stages['detect'].append((t2 - t1) * 1000)
+        stages['annotate'].append((t3 - t2) * 1000)
+        stages['total'].append((t3 - t0) * 1000)
+        frames += 1
+    elapsed = time.perf_counter() - t_begin
+    return {
+        'frames': frames,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {stage: summarize(samples) for stage, samples in stages.items()}
+    }
+
+
+def benchmark(opt):
+    """回放录制文件并统计处理流程的吞吐量"""
+    use_onnx = opt.weights.endswith('.onnx')
+    detector = YOLODetector(opt.weights, yaml_path=opt.data, conf_threshold=opt.conf_thres, use_onnx=use_onnx,
+                            img_size=opt.img_size, auto=opt.rect)
+    camera = ReplayCamera(opt.recording, realtime=opt.realtime, loop=opt.loops > 1)
+    camera.start()
+    try:
+        results = run_pipeline(camera, detector, max_frames=len(camera) * opt.loops)
+    finally:
+        camera.stop()
+
+    results = {
+        'recording': opt.recording,
+        'model': Path(opt.weights).name,
+        'img_size': detector.img_size,
+        'realtime': opt.realtime,
+        **results
+    }
+    print(f"处理 {results['frames']} 帧，{results['fps']:.1f} FPS")
+    for stage, stats in results['latency_ms'].items():
+        print(f"{stage:<10} 平均 {stats['mean']:.2f}ms  p50 {stats['p50']:.2f}ms  p95 {stats['p95']:.2f}ms")
+    if opt.output:
+        Path(opt.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(opt.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {opt.output}")
+
+
+def load_sample_frame(recording: str = None) -> np.ndarray:
+    """读取录制文件的第一帧，未指定录制文件时使用640x480的空白图像"""
+    if not recording:
+        return np.full((480, 640, 3), 114, dtype=np.uint8)
+    camera = ReplayCamera(recording)
+    camera.start()
+    try:
+        return np.array(camera.get_frame())
+    finally:
+        camera.stop()
+
+
+def measure_first_frame(opt, warmup: bool) -> Dict:
+    """加载模型并测量第一帧和稳定后的检测耗时，在独立的子进程中运行"""
+    frame = load_sample_frame(opt.recording)
+    use_onnx = opt.weights.endswith('.onnx')
+    t0 = time.perf_counter()
+    detector = YOLODetector(opt.weights, yaml_path=opt.data, use_onnx=use_onnx, img_size=opt.img_size,
+                            auto=opt.rect)
+    t1 = time.perf_counter()
+    if warmup:
+        detector.warmup([frame.shape[:2]], iterations=opt.iterations)
+    t2 = time.perf_counter()
+    detector.detect(frame)
+    t3 = time.perf_counter()
+    steady = []
+    for _ in range(20):
+        t = time.perf_counter()
+        detector.detect(frame)
+        steady.append((time.perf_counter() - t) * 1000)
+    return {
+        'load_ms': (t1 - t0) * 1000,
+        'warmup_ms': (t2 - t1) * 1000,
+        'first_frame_ms': (t3 - t2) * 1000,
+        'steady_ms': summarize(steady)
+    }
+
+
+def first_frame(opt):
+    """对比预热前后第一帧的检测耗时，并测试热切换模型期间的逐帧耗时"""
+    # 每种情况在新的进程中测量，避免后运行的一方沾到先运行一方已完成的进程级初始化
+    # （ONNX Runtime/CUDA上下文、torch.hub导入、内存池等）
+    ctx = mp.get_context('spawn')
+    results = {}
+    for warmup in (False, True):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            results['warm' if warmup else 'cold'] = executor.submit(measure_first_frame, opt, warmup).result()
+    for name, r in results.items():
+        print(f"{'预热后' if name == 'warm' else '未预热'}: 加载 {r['load_ms']:.1f}ms，预热 {r['warmup_ms']:.1f}ms，"
+              f"第一帧 {r['first_frame_ms']:.2f}ms，稳定后平均 {r['steady_ms']['mean']:.2f}ms")
+
+    if opt.swap:
+        # 后台切换模型的同时持续检测，统计切换期间的逐帧耗时
+        frame = load_sample_frame(opt.recording)
+        detector = YOLODetector(opt.weights, yaml_path=opt.data, use_onnx=opt.weights.endswith('.onnx'),
+                                img_size=opt.img_size, auto=opt.rect)
+        detector.warmup([frame.shape[:2]], iterations=opt.iterations)
+        latencies = []
+        detector.swap_model_async(opt.swap, frame_shapes=[frame.shape[:2]])
+        while detector.swap_thread.is_alive() or len(latencies) < 20:
+            t = time.perf_counter()
+            detector.detect(frame)
+            latencies.append((time.perf_counter() - t) * 1000)
+        results['swap'] = {'frames': len(latencies), 'latency_ms': summarize(latencies)}
+        stats = results['swap']['latency_ms']
+        print(f"热切换期间: 检测 {len(latencies)} 帧，平均 {stats['mean']:.2f}ms，最大 {stats['max']:.2f}ms")
+
+    if opt.output:
+        Path(opt.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(opt.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {opt.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='录制摄像头数据并回放测试处理流程吞吐量')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='录制摄像头数据')
+    record_parser.add_argument('--camera', choices=['web', 'realsense'], default='realsense', help='摄像头类型')
+    record_parser.add_argument('--camera-id', type=int, default=0, help='普通摄像头ID')
+    record_parser.add_argument('--no-depth', default=False, action='store_true', help='不录制深度帧')
+    record_parser.add_argument('--frames', type=int, default=300, help='录制帧数')
+    record_parser.add_argument('--output', type=str, default='recordings/capture.rec', help='录制文件路径')
+
+    run_parser = subparsers.add_parser('run', help='回放录制文件并测试吞吐量')
+    run_parser.add_argument('--recording', type=str, default='recordings/capture.rec', help='录制文件路径')
+    run_parser.add_argument('--weights', type=str, default='models/best.onnx', help='模型路径(.pt/.onnx)')
+    run_parser.add_argument('--data', type=str, default='datasets/custom.yaml', help='数据集配置文件')
+    run_parser.add_argument('--img-size', type=int, default=640, help='inference size (pixels)')
+    run_parser.add_argument('--rect', default=False, action='store_true', help='矩形letterbox（仅动态形状的ONNX模型，PyTorch模型始终为矩形）')
+    run_parser.add_argument('--conf-thres', type=float, default=0.75, help='object confidence threshold')
+    run_parser.add_argument('--realtime', default=False, action='store_true', help='按录制时间间隔回放')
+    run_parser.add_argument('--loops', type=int, default=1, help='回放次数')
+    run_parser.add_argument('--output', type=str, default=None, help='结果JSON路径')
+    warmup_parser = subparsers.add_parser('warmup', help='对比预热前后第一帧的检测耗时')
+    warmup_parser.add_argument('--recording', type=str, default=None, help='取第一帧作为输入的录制文件，默认为空白图像')
+    warmup_parser.add_argument('--weights', type=str, default='models/best.onnx', help='模型路径(.pt/.onnx)')
+    warmup_parser.add_argument('--data', type=str, default='datasets/custom.yaml', help='数据集配置文件')
+    warmup_parser.add_argument('--img-size', type=int, default=640, help='inference size (pixels)')
+    warmup_parser.add_argument('--rect', default=False, action='store_true', help='矩形letterbox（仅动态形状的ONNX模型，PyTorch模型始终为矩形）')
+    warmup_parser.add_argument('--iterations', type=int, default=3, help='预热次数')
+    warmup_parser.add_argument('--swap', type=str, default=None, help='测试热切换到该模型期间的逐帧耗时')
+    warmup_parser.add_argument('--output', type=str, default=None, help='结果JSON路径')
+    opt = parser.parse_args()
+
+    if opt.command == 'record':
+        record(opt)
+    elif opt.command == 'warmup':
+        first_frame(opt)
+    else:
+        benchmark(opt)
+
+
+if __name__ == '__main__':
+    main()
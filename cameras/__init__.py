@@ -1,5 +1,7 @@
 from .base import Camera
 from .web_camera import WebCamera
 from .realsense_camera import RealSenseCamera
+from .recording_camera import RecordingCamera
+from .replay_camera import ReplayCamera
 
-__all__ = ['Camera', 'WebCamera', 'RealSenseCamera'] 
\ No newline at end of file
+__all__ = ['Camera', 'WebCamera', 'RealSenseCamera', 'RecordingCamera', 'ReplayCamera']
\ No newline at end of file
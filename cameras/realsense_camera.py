@@ -18,6 +18,8 @@ class RealSenseCamera(Camera):
         self.depth_frame = None
         self.color_frame = None
         self.enable_depth = enable_depth
+        # 深度值单位（米/原始单位），启动后从设备读取
+        self.depth_scale = 0.001
 
     def start(self):
         """启动RealSense摄像头"""
@@ -31,7 +33,9 @@ class RealSenseCamera(Camera):
             self.config.enable_stream(rs.stream.depth, 640, 480, rs.format.z16, 30)
             self.align = rs.align(rs.stream.color)
             
-        self.pipeline.start(self.config)
+        profile = self.pipeline.start(self.config)
+        if self.enable_depth:
+            self.depth_scale = profile.get_device().first_depth_sensor().get_depth_scale()
         self.is_running = True
 
     def stop(self):
@@ -0,0 +1,108 @@
+import time
+import struct
+import numpy as np
+from .base import Camera
+
+# 录制文件格式：
+#   文件头（64字节）：魔数、版本号、深度单位
+#   之后为连续的帧数据块，每块由64字节的块头和原始像素数据组成：
+#   彩色图(uint8, HxWxC) + 深度图(uint16 z16, HxW，可选)，各自按64字节对齐，
+#   回放时可直接对文件做内存映射，无需解码
+MAGIC = b'YCAMREC1'
+VERSION = 1
+ALIGN = 64
+FILE_HEADER = struct.Struct('<8sId')
+CHUNK_TAG = b'FRAM'
+# 标记、时间戳(ns)、彩色图高宽通道、深度图高宽、数据块总长度
+CHUNK_HEADER = struct.Struct('<4sqIIIIIQ')
+
+
+def aligned(n: int) -> int:
+    """向上对齐到ALIGN字节"""
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class RecordingCamera(Camera):
+    """录制摄像头类，包装任意摄像头并将彩色帧（及RealSense深度帧）连同时间戳写入录制文件"""
+    def __init__(self, camera: Camera, path: str, record_depth: bool = True):
+        """
+        初始化录制摄像头
+        Args:
+            camera: 被包装的摄像头
+            path: 录制文件路径
+            record_depth: 是否录制深度帧（仅在被包装摄像头启用深度时生效）
+        """
+        super().__init__()
+        self.camera = camera
+        self.path = path
+        self.record_depth = record_depth
+        self.file = None
+        self.frame_count = 0
+
+    def __getattr__(self, name):
+        # 其余属性和方法（如enable_depth、get_depth_at_point）转发给被包装的摄像头
+        if name == 'camera':
+            raise AttributeError(name)
+        return getattr(self.camera, name)
+
+    def start(self):
+        """启动被包装的摄像头并创建录制文件"""
+        self.camera.start()
+        self.file = open(self.path, 'wb')
+        depth_scale = getattr(self.camera, 'depth_scale', 0.001)
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, depth_scale).ljust(ALIGN, b'\0'))
+        self.frame_count = 0
+        self.is_running = True
+
+    def stop(self):
+        """停止被包装的摄像头并关闭录制文件"""
+        self.camera.stop()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.is_running = False
+
+    def get_frame(self):
+        """获取当前帧并写入录制文件"""
+        if not self.is_running:
+            return None
+        frame = self.camera.get_frame()
+        if frame is None:
+            return None
+
+        depth = None
+        if self.record_depth and getattr(self.camera, 'enable_depth', False):
+            depth = self.camera.get_depth_frame()
+        self.write_frame(frame, depth)
+        self.frame = frame
+        return frame
+
+    def write_frame(self, frame: np.ndarray, depth: np.ndarray = None, timestamp_ns: int = None):
+        """
+        写入一帧
+        Args:
+            frame: 彩色图像(HxW或HxWxC, uint8)
+            depth: 深度图像(HxW, uint16)，可为None
+            timestamp_ns: 时间戳（纳秒），默认为当前单调时钟
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        color_size = aligned(frame.nbytes)
+        if depth is not None:
+            depth = np.ascontiguousarray(depth, dtype='<u2')
+            dh, dw = depth.shape
+            depth_size = aligned(depth.nbytes)
+        else:
+            dh = dw = depth_size = 0
+
+        header = CHUNK_HEADER.pack(CHUNK_TAG, timestamp_ns, h, w, c, dh, dw, color_size + depth_size)
+        self.file.write(header.ljust(ALIGN, b'\0'))
+        self.file.write(frame.data)
+        self.file.write(b'\0' * (color_size - frame.nbytes))
+        if depth is not None:
+            self.file.write(depth.data)
+            self.file.write(b'\0' * (depth_size - depth.nbytes))
+        self.frame_count += 1
@@ -0,0 +1,147 @@
+import mmap
+import time
+import numpy as np
+from .base import Camera
+from .recording_camera import ALIGN, CHUNK_HEADER, CHUNK_TAG, FILE_HEADER, MAGIC, VERSION
+
+
+class ReplayCamera(Camera):
+    """回放摄像头类，对RecordingCamera生成的录制文件做内存映射并按顺序回放"""
+    def __init__(self, path: str, realtime: bool = False, loop: bool = False, drop_late: bool = False):
+        """
+        初始化回放摄像头
+        Args:
+            path: 录制文件路径
+            realtime: 是否按录制时的时间间隔回放，为False时尽可能快地回放
+            loop: 回放结束后是否从头开始
+            drop_late: 按时间间隔回放时是否跳过处理不及时而已过期的帧，模拟实时摄像头只提供最新帧
+        """
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.drop_late = drop_late
+        # 当前帧的到达时间（单调时钟纳秒），按时间间隔回放时为按录制时间戳计算的到达时间
+        self.frame_time_ns = None
+        # drop_late时跳过的帧数
+        self.dropped = 0
+        self.file = None
+        self.mm = None
+        self.index = []
+        self.position = 0
+        self.depth_scale = 0.001
+        self.depth = None
+        self.start_time = None
+
+    def start(self):
+        """打开录制文件并建立帧索引"""
+        self.file = open(self.path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.depth_scale = FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.stop()
+            raise Exception(f"无法识别的录制文件 {self.path}")
+
+        self.index = []
+        offset = ALIGN
+        while offset + ALIGN <= len(self.mm):
+            tag, timestamp_ns, h, w, c, dh, dw, size = CHUNK_HEADER.unpack_from(self.mm, offset)
+            data_offset = offset + ALIGN
+            if tag != CHUNK_TAG or data_offset + size > len(self.mm):
+                # 录制中断时最后一块可能不完整
+                break
+            color_shape = (h, w, c) if c > 1 else (h, w)
+            depth_shape = (dh, dw) if dh and dw else None
+            depth_offset = data_offset + size - (dh * dw * 2 + ALIGN - 1) // ALIGN * ALIGN
+            self.index.append((timestamp_ns, data_offset, color_shape, depth_offset, depth_shape))
+            offset = data_offset + size
+
+        self.position = 0
+        self.start_time = None
+        self.dropped = 0
+        self.is_running = True
+
+    def stop(self):
+        """停止回放并释放内存映射"""
+        self.frame = None
+        self.depth = None
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                # 仍有外部引用的帧视图，交由垃圾回收释放
+                pass
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.is_running = False
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def enable_depth(self) -> bool:
+        """录制文件是否包含深度帧"""
+        return any(entry[4] is not None for entry in self.index)
+
+    def get_frame(self):
+        """获取下一帧，返回内存映射上的只读视图；回放结束时返回None并停止"""
+        if not self.is_running:
+            return None
+        if self.position >= len(self.index):
+            if not self.loop or not self.index:
+                self.is_running = False
+                return None
+            self.position = 0
+            self.start_time = None
+
+        if self.realtime:
+            # 以第一帧为基准，按录制时间戳等待
+            if self.start_time is None:
+                self.start_time = time.monotonic_ns() - self.index[self.position][0]
+            if self.drop_late:
+                # 跳到已经到达的最新一帧
+                now = time.monotonic_ns()
+                while self.position + 1 < len(self.index) and self.start_time + self.index[self.position + 1][0] <= now:
+                    self.position += 1
+                    self.dropped += 1
+        timestamp_ns, color_offset, color_shape, depth_offset, depth_shape = self.index[self.position]
+        if self.realtime:
+            self.frame_time_ns = self.start_time + timestamp_ns
+            delay = (self.frame_time_ns - time.monotonic_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            self.frame_time_ns = time.monotonic_ns()
+
+        self.frame = np.frombuffer(self.mm, dtype=np.uint8, count=int(np.prod(color_shape)),
+                                   offset=color_offset).reshape(color_shape)
+        if depth_shape is not None:
+            self.depth = np.frombuffer(self.mm, dtype='<u2', count=depth_shape[0] * depth_shape[1],
+                                       offset=depth_offset).reshape(depth_shape)
+        else:
+            self.depth = None
+        self.position += 1
+        return self.frame
+
+    def get_depth_frame(self):
+        """获取当前帧对应的深度帧(z16)"""
+        if not self.is_running:
+            return None
+        return self.depth
+
+    def get_depth_at_point(self, x: int, y: int) -> float:
+        """
+        获取指定像素点的深度值
+        Args:
+            x: 像素x坐标
+            y: 像素y坐标
+        Returns:
+            深度值（米），与RealSenseCamera一致
+        """
+        if self.depth is None:
+            return None
+        if 0 <= x < self.depth.shape[1] and 0 <= y < self.depth.shape[0]:
+            return float(self.depth[y, x]) * self.depth_scale
+        return None
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from utils import letterbox
+
+# 与prepare_dataset.py保持一致的图片格式
+IMG_FORMATS = ('.jpg', '.jpeg', '.png')
+CACHE_VERSION = 1
+
+
+def list_images(image_dir: str) -> List[str]:
+    """按文件名排序列出目录下的所有图片"""
+    return sorted(f for f in os.listdir(image_dir) if f.lower().endswith(IMG_FORMATS))
+
+
+def default_cache_path(image_dir: str) -> str:
+    """默认缓存路径：images/val -> images/val.cache(.npy/.json)"""
+    return str(Path(image_dir).resolve()) + '.cache'
+
+
+def _fingerprint(path: str) -> Dict:
+    """用文件大小和修改时间标识源文件是否变化"""
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _normalize_size(img_size: Union[int, Tuple[int, int]]) -> Tuple[int, int]:
+    if isinstance(img_size, int):
+        return img_size, img_size
+    return tuple(img_size)
+
+
+class DatasetCache:
+    """
+    预处理数据集缓存
+    将图片letterbox后的结果保存为内存映射的uint8张量文件(.npy，形状为N x H x W x 3)，
+    并在索引文件(.json)中记录每张图片的原始尺寸、缩放比例和填充。
+    """
+    def __init__(self, cache_path: str):
+        """
+        打开已有的缓存
+        Args:
+            cache_path: 缓存路径（不含扩展名）
+        """
+        self.cache_path = cache_path
+        with open(cache_path + '.json', 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.version = index.get('version')
+        self.image_dir = index['image_dir']
+        self.img_size = tuple(index['img_size'])
+        self.entries = index['entries']
+        # 只读内存映射，切片即为零拷贝视图
+        self.data = np.load(cache_path + '.npy', mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, Dict]:
+        return self.data[i], self.meta(i)
+
+    def meta(self, i: int) -> Dict:
+        """第i张图片的索引信息"""
+        entry = self.entries[i]
+        return {
+            'file': os.path.join(self.image_dir, entry['file']),
+            'shape': tuple(entry['shape']),
+            'ratio': tuple(entry['ratio']),
+            'pad': tuple(entry['pad'])
+        }
+
+    def iter_batches(self, batch_size: int = 8) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+        """
+        按批次遍历缓存
+        Yields:
+            (NHWC格式的内存映射切片, 索引信息列表)
+        """
+        for start in range(0, len(self), batch_size):
+            end = min(start + batch_size, len(self))
+            yield self.data[start:end], [self.meta(i) for i in range(start, end)]
+
+    def is_valid(self, image_dir: Optional[str] = None, img_size: Optional[Union[int, Tuple[int, int]]] = None) -> bool:
+        """
+        检查缓存是否仍然有效：版本、输入尺寸、文件列表以及每个源文件的大小和修改时间都需一致
+        """
+        if self.version != CACHE_VERSION:
+            return False
+        if img_size is not None and _normalize_size(img_size) != self.img_size:
+            return False
+        image_dir = image_dir or self.image_dir
+        if not os.path.isdir(image_dir):
+            return False
+        files = list_images(image_dir)
+        if files != [entry['file'] for entry in self.entries]:
+            return False
+        for entry in self.entries:
+            fingerprint = _fingerprint(os.path.join(image_dir, entry['file']))
+            if fingerprint != {'size': entry['size'], 'mtime_ns': entry['mtime_ns']}:
+                return False
+        return self.data.shape == (len(self.entries), *self.img_size, 3)
+
+    def close(self):
+        """释放内存映射，Windows下被映射的文件无法被替换或删除"""
+        self.data = None
+
+
+def build_cache(image_dir: str, cache_path: Optional[str] = None,
+                img_size: Union[int, Tuple[int, int]] = 640) -> DatasetCache:
+    """
+    对目录下的所有图片执行一次letterbox，并写入内存映射缓存
+    Args:
+        image_dir: 图片目录，例如datasets/images/val
+        cache_path: 缓存路径（不含扩展名），为None时使用默认路径
+        img_size: letterbox后的尺寸
+    Returns:
+        构建好的DatasetCache
+    """
+    cache_path = cache_path or default_cache_path(image_dir)
+    img_size = _normalize_size(img_size)
+    files = list_images(image_dir)
+
+    # 先写临时文件，完成后再替换，避免中断时留下损坏的缓存
+    tmp_data = cache_path + '.tmp.npy'
+    data = np.lib.format.open_memmap(tmp_data, mode='w+', dtype=np.uint8, shape=(len(files), *img_size, 3))
+    entries = []
+    for i, file in enumerate(files):
+        path = os.path.join(image_dir, file)
+        fingerprint = _fingerprint(path)
+        img0 = cv2.imread(path)
+        if img0 is None:
+            raise Exception(f"无法读取图片 {path}")
+        img, ratio, pad = letterbox(img0, new_shape=img_size)
+        data[i] = img
+        entries.append({
+            'file': file,
+            'shape': list(img0.shape[:2]),
+            'ratio': [float(r) for r in ratio],
+            'pad': [float(p) for p in pad],
+            **fingerprint
+        })
+    data.flush()
+    del data
+
+    index = {
+        'version': CACHE_VERSION,
+        'image_dir': str(Path(image_dir).resolve()),
+        'img_size': list(img_size),
+        'entries': entries
+    }
+    tmp_index = cache_path + '.tmp.json'
+    with open(tmp_index, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_data, cache_path + '.npy')
+    os.replace(tmp_index, cache_path + '.json')
+    return DatasetCache(cache_path)
+
+
+def load_cache(image_dir: str, cache_path: Optional[str] = None,
+               img_size: Union[int, Tuple[int, int]] = 640) -> DatasetCache:
+    """
+    加载缓存，若缓存不存在或源文件已变化则重新构建
+    """
+    cache_path = cache_path or default_cache_path(image_dir)
+    if os.path.exists(cache_path + '.npy') and os.path.exists(cache_path + '.json'):
+        cache = None
+        try:
+            cache = DatasetCache(cache_path)
+            if cache.is_valid(image_dir, img_size):
+                return cache
+            print(f"缓存 {cache_path} 已失效，重新构建")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"缓存 {cache_path} 无法读取（{e}），重新构建")
+        # 重新构建前释放旧缓存的内存映射，否则Windows下无法替换缓存文件
+        if cache is not None:
+            cache.close()
+            del cache
+    return build_cache(image_dir, cache_path, img_size)
+
+
+def benchmark(opt):
+    """对比使用缓存与不使用缓存时每轮评估的耗时"""
+    from detector import YOLODetector
+
+    use_onnx = opt.weights.endswith('.onnx')
+    detector = YOLODetector(opt.weights, yaml_path=opt.data, conf_threshold=opt.conf_thres, use_onnx=use_onnx)
+    cache = load_cache(opt.images, opt.cache, detector.img_size)
+    files = [os.path.join(opt.images, f) for f in list_images(opt.images)]
+
+    def epoch_without_cache():
+        for file in files:
+            detector.detect(cv2.imread(file))
+
+    def epoch_with_cache():
+        for _ in detector.detect_cache(cache, batch_size=opt.batch_size):
+            pass
+
+    def decode_only():
+        for file in files:
+            letterbox(cv2.imread(file), new_shape=detector.img_size)
+
+    def cache_read_only():
+        for imgs, _ in cache.iter_batches(opt.batch_size):
+            detector.to_tensor(imgs)
+
+    print(f"图片数量: {len(files)}，批大小: {opt.batch_size}，轮数: {opt.epochs}")
+    for name, fn in [('解码+letterbox', decode_only), ('缓存读取', cache_read_only),
+                     ('完整评估（无缓存）', epoch_without_cache), ('完整评估（缓存）', epoch_with_cache)]:
+        times = []
+        for _ in range(opt.epochs):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        best = min(times)
+        print(f"{name}: 每轮 {best:.3f}s（最快）/ {sum(times) / len(times):.3f}s（平均），"
+              f"{len(files) / best:.1f} 张/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='构建预处理数据集缓存并测试评估耗时')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='构建缓存')
+    build_parser.add_argument('--images', type=str, default='datasets/images/val', help='图片目录')
+    build_parser.add_argument('--cache', type=str, default=None, help='缓存路径（不含扩展名）')
+    build_parser.add_argument('--img-size', type=int, default=640, help='letterbox尺寸 (pixels)')
+
+    bench_parser = subparsers.add_parser('bench', help='对比有无缓存时的评估耗时')
+    bench_parser.add_argument('--images', type=str, default='datasets/images/val', help='图片目录')
+    bench_parser.add_argument('--cache', type=str, default=None, help='缓存路径（不含扩展名）')
+    bench_parser.add_argument('--weights', type=str, default='models/best.onnx', help='模型路径(.pt/.onnx)')
+    bench_parser.add_argument('--data', type=str, default='datasets/custom.yaml', help='数据集配置文件')
+    bench_parser.add_argument('--conf-thres', type=float, default=0.25, help='object confidence threshold')
+    bench_parser.add_argument('--batch-size', type=int, default=8, help='每批图像数量')
+    bench_parser.add_argument('--epochs', type=int, default=3, help='重复轮数')
+    opt = parser.parse_args()
+
+    if opt.command == 'build':
+        t0 = time.perf_counter()
+        cache = build_cache(opt.images, opt.cache, opt.img_size)
+        print(f"缓存构建完成：{cache.cache_path}.npy，共 {len(cache)} 张，耗时 {time.perf_counter() - t0:.2f}s")
+    else:
+        benchmark(opt)
+
+
+if __name__ == '__main__':
+    main()
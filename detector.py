@@ -2,18 +2,27 @@ import torch
 import cv2
 import numpy as np
 import yaml
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 import warnings
 import os
+import copy
+import time
+import threading
 import onnxruntime
 from utils import letterbox, scale_coords
 
 # 过滤特定的警告
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+# 由init_onnx_model/init_torch_model设置的模型相关属性，热切换模型时整体替换
+# （img_size单独处理：只有新模型为静态形状时才采用模型声明的尺寸）
+MODEL_ATTRS = ('model', 'use_onnx', 'input_name', 'output_name', 'device', 'dynamic')
+
 class YOLODetector:
     """YOLOv5目标检测类"""
-    def __init__(self, model_path: str, yaml_path: str = None, conf_threshold: float = 0.25, use_onnx: bool = False):
+    def __init__(self, model_path: str, yaml_path: str = None, conf_threshold: float = 0.25, use_onnx: bool = False,
+                 iou_threshold: Optional[float] = None, img_size: Union[int, Tuple[int, int]] = 640,
+                 auto: bool = False):
         """
         初始化检测器
         Args:
@@ -21,6 +30,10 @@ class YOLODetector:
             yaml_path: 数据集配置文件路径，如果为None则使用默认路径
             conf_threshold: 置信度阈值
             use_onnx: 是否使用ONNX模型
+            iou_threshold: NMS的IoU阈值，为None时ONNX模型不执行NMS，PyTorch模型使用默认值
+            img_size: 输入尺寸，整数或(h, w)；静态形状的ONNX模型以模型声明的尺寸为准
+            auto: 是否使用矩形letterbox（只填充到步长的整数倍），仅对动态形状的ONNX模型生效；
+                PyTorch模型由AutoShape始终做矩形letterbox
         """
         # 加载类别名称
         if yaml_path is None:
@@ -36,8 +49,20 @@ class YOLODetector:
             self.names = {}
         
         self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
         self.use_onnx = use_onnx
-        self.img_size = 640
+        self.img_size = img_size
+        # 用户设置的输入尺寸，切换回动态形状模型时恢复
+        self.requested_img_size = img_size
+        self.auto = auto
+        self.stride = 32
+        # 模型是否支持任意输入尺寸，ONNX模型在加载时根据输入形状确定
+        self.dynamic = True
+        # 最近一次检测各阶段的耗时（毫秒）
+        self.timings = {'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+        # 检测与模型热切换互斥，保证切换时不会有检测使用一半新一半旧的模型
+        self._lock = threading.RLock()
+        self.swap_thread = None
         
         if use_onnx:
             self.init_onnx_model(model_path)
@@ -51,25 +76,159 @@ class YOLODetector:
         self.output_name = self.model.get_outputs()[0].name
         input_shape = self.model.get_inputs()[0].shape
         print(f"ONNX模型输入形状: {input_shape}")
+        h, w = input_shape[2:4]
+        self.dynamic = not (isinstance(h, int) and isinstance(w, int))
+        if not self.dynamic and (h, w) != self.input_shape:
+            print(f"ONNX模型输入尺寸固定为 {h}x{w}，忽略设置的输入尺寸 {self.img_size}")
+            self.img_size = h if h == w else (h, w)
 
     def init_torch_model(self, model_path: str):
         """初始化PyTorch模型"""
         with torch.amp.autocast('cuda'):
             self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path)
             self.model.conf = self.conf_threshold
+            if self.iou_threshold is not None:
+                self.model.iou = self.iou_threshold
             self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
             self.model.to(self.device)
+            self.dynamic = True
+
+    def warmup(self, frame_shapes: Optional[List[Tuple[int, int]]] = None, iterations: int = 3) -> List[float]:
+        """
+        使用空白图像预热模型，提前完成显存/内存分配和计算图初始化
+        Args:
+            frame_shapes: 模拟的输入帧尺寸(h, w)列表，默认为模型输入尺寸
+            iterations: 每个尺寸的预热次数
+        Returns:
+            每次预热检测的耗时（毫秒）
+        """
+        latencies = []
+        for h, w in frame_shapes or [self.input_shape]:
+            frame = np.full((h, w, 3), 114, dtype=np.uint8)
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                self.detect(frame)
+                latencies.append((time.perf_counter() - t0) * 1000)
+        return latencies
+
+    def load_model(self, model_path: str, use_onnx: Optional[bool] = None, warmup: bool = True,
+                   frame_shapes: Optional[List[Tuple[int, int]]] = None):
+        """
+        加载并预热新模型，完成后原子地替换当前模型；加载期间仍使用当前模型检测
+        Args:
+            model_path: 新模型路径
+            use_onnx: 是否为ONNX模型，为None时根据扩展名判断
+            warmup: 替换前是否预热
+            frame_shapes: 预热时模拟的输入帧尺寸(h, w)列表
+        """
+        if use_onnx is None:
+            use_onnx = model_path.endswith('.onnx')
+        # 在副本上加载模型，类别名称、阈值等配置与当前检测器相同
+        shadow = copy.copy(self)
+        shadow._lock = threading.RLock()
+        shadow.use_onnx = use_onnx
+        if use_onnx:
+            shadow.init_onnx_model(model_path)
+        else:
+            shadow.init_torch_model(model_path)
+        if shadow.dynamic:
+            shadow.img_size = shadow.requested_img_size
+        if warmup:
+            shadow.warmup(frame_shapes)
+        with self._lock:
+            for attr in MODEL_ATTRS:
+                if hasattr(shadow, attr):
+                    setattr(self, attr, getattr(shadow, attr))
+            # 副本的尺寸是复制时的快照，加载期间通过set_img_size所做的调整以当前检测器为准
+            self.img_size = self.requested_img_size if shadow.dynamic else shadow.img_size
+
+    def swap_model_async(self, model_path: str, use_onnx: Optional[bool] = None,
+                         frame_shapes: Optional[List[Tuple[int, int]]] = None, callback=None) -> bool:
+        """
+        在后台线程中加载、预热并切换模型
+        Args:
+            model_path: 新模型路径
+            use_onnx: 是否为ONNX模型，为None时根据扩展名判断
+            frame_shapes: 预热时模拟的输入帧尺寸(h, w)列表
+            callback: 切换结束后调用，参数为是否成功
+        Returns:
+            是否开始切换，上一次切换尚未完成时返回False
+        """
+        if self.swap_thread is not None and self.swap_thread.is_alive():
+            return False
+
+        def run():
+            try:
+                self.load_model(model_path, use_onnx, warmup=True, frame_shapes=frame_shapes)
+                success = True
+            except Exception as e:
+                print(f"模型切换失败: {str(e)}")
+                success = False
+            if callback is not None:
+                callback(success)
+
+        self.swap_thread = threading.Thread(target=run, name='model-swap', daemon=True)
+        self.swap_thread.start()
+        return True
+
+    @property
+    def input_shape(self) -> Tuple[int, int]:
+        """输入尺寸(h, w)"""
+        if isinstance(self.img_size, int):
+            return self.img_size, self.img_size
+        return tuple(self.img_size)
+
+    def set_img_size(self, img_size: Union[int, Tuple[int, int]]):
+        """
+        运行时调整输入尺寸
+        Args:
+            img_size: 新的输入尺寸，整数或(h, w)，必须是步长的整数倍
+        """
+        shape = (img_size, img_size) if isinstance(img_size, int) else tuple(img_size)
+        if any(s % self.stride for s in shape):
+            raise ValueError(f"输入尺寸 {img_size} 必须是步长 {self.stride} 的整数倍")
+        with self._lock:
+            if not self.dynamic and shape != self.input_shape:
+                raise ValueError(f"ONNX模型输入尺寸固定为 {self.input_shape}，不支持调整为 {img_size}")
+            self.img_size = img_size
+            self.requested_img_size = img_size
+
+    def try_set_img_size(self, img_size: Union[int, Tuple[int, int]]) -> bool:
+        """
+        模型支持动态输入尺寸时调整输入尺寸；检查与调整在同一把锁内完成，不会与模型热切换交错
+        Returns:
+            是否调整，当前模型为静态形状时返回False
+        """
+        with self._lock:
+            if not self.dynamic:
+                return False
+            self.set_img_size(img_size)
+            return True
 
     def preprocess(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """预处理图像"""
         img0 = frame.copy()
-        img = letterbox(frame, new_shape=self.img_size)[0]
-        img = img[:, :, ::-1].transpose(2, 0, 1)
-        img = np.ascontiguousarray(img).astype(np.float32)
-        img /= 255.0
-        img = np.expand_dims(img, axis=0)
+        img = letterbox(frame, new_shape=self.img_size, auto=self.auto and self.dynamic, stride=self.stride)[0]
+        img = self.to_tensor(img)
         return img0, img
 
+    @staticmethod
+    def to_tensor(imgs: np.ndarray) -> np.ndarray:
+        """
+        将letterbox后的uint8图像转换为模型输入张量
+        Args:
+            imgs: HWC或NHWC格式的BGR图像，可以是内存映射数组的切片
+        Returns:
+            NCHW格式、归一化到[0, 1]的RGB float32张量
+        """
+        if imgs.ndim == 3:
+            imgs = imgs[np.newaxis]
+        img = imgs[..., ::-1].transpose(0, 3, 1, 2)
+        # 只在转换为float32时拷贝一次
+        img = np.ascontiguousarray(img, dtype=np.float32)
+        img /= 255.0
+        return img
+
     def detect(self, frame: np.ndarray) -> List[Dict]:
         """
         检测图像中的目标
@@ -78,52 +237,97 @@ class YOLODetector:
         Returns:
             检测结果列表，每个结果包含类别、置信度、边界框和中心点坐标
         """
-        if self.use_onnx:
-            return self.detect_onnx(frame)
-        else:
-            return self.detect_torch(frame)
+        with self._lock:
+            if self.use_onnx:
+                return self.detect_onnx(frame)
+            else:
+                return self.detect_torch(frame)
 
     def detect_onnx(self, frame: np.ndarray) -> List[Dict]:
         """使用ONNX模型进行检测"""
+        t0 = time.perf_counter()
         img0, img = self.preprocess(frame)
+        t1 = time.perf_counter()
         pred = self.model.run(None, {self.input_name: img})[0]
+        t2 = time.perf_counter()
         pred = pred.astype(np.float32)
         pred = np.squeeze(pred, axis=0)
-        
+        detections = self.postprocess_onnx(pred, img.shape[2:], img0.shape[:2])
+        self._record_timings(t0, t1, t2, time.perf_counter())
+        return detections
+
+    def _record_timings(self, t0: float, t1: float, t2: float, t3: float):
+        """记录预处理、推理和后处理耗时（毫秒）"""
+        self.timings = {
+            'preprocess': (t1 - t0) * 1000,
+            'inference': (t2 - t1) * 1000,
+            'postprocess': (t3 - t2) * 1000
+        }
+
+    def _record_torch_timings(self, results, n: int = 1):
+        """YOLOv5的Detections对象记录了每张图的(预处理, 推理, NMS)耗时"""
+        t = getattr(results, 't', None)
+        if t is not None and len(t) == 3:
+            self.timings = {
+                'preprocess': t[0] * n,
+                'inference': t[1] * n,
+                'postprocess': t[2] * n
+            }
+
+    def postprocess_onnx(self, pred: np.ndarray, img1_shape: Tuple[int, int], img0_shape: Tuple[int, int],
+                         ratio_pad: Optional[Tuple] = None) -> List[Dict]:
+        """
+        解析单张图像的ONNX输出
+        Args:
+            pred: 模型输出，形状为(num_boxes, 5 + num_classes)
+            img1_shape: 模型输入图像尺寸(h, w)
+            img0_shape: 原始图像尺寸(h, w)
+            ratio_pad: letterbox返回的(缩放比例, 填充)，为None时根据尺寸计算
+        Returns:
+            检测结果列表
+        """
+        scores = pred[:, 5:]
+        class_ids = np.argmax(scores, axis=1)
+        confidences = scores[np.arange(len(pred)), class_ids] * pred[:, 4]
+        keep = confidences > self.conf_threshold
+        pred, class_ids, confidences = pred[keep], class_ids[keep], confidences[keep]
+
+        # 中心点宽高转换为左上角、右下角坐标
+        center_x, center_y, width, height = pred[:, 0:4].astype(int).T
+        x1 = (center_x - width / 2).astype(int)
+        y1 = (center_y - height / 2).astype(int)
+        boxes = np.stack([x1, y1, x1 + width, y1 + height], axis=1).astype(np.float32)
+
+        if self.iou_threshold is not None and len(boxes):
+            # 按类别偏移坐标，使不同类别的框互不抑制
+            offset = class_ids[:, None] * 4096
+            nms_boxes = np.concatenate([boxes[:, :2] + offset, boxes[:, 2:4] - boxes[:, :2]], axis=1)
+            idxs = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), self.conf_threshold, self.iou_threshold)
+            idxs = np.array(idxs, dtype=int).reshape(-1)
+            boxes, class_ids, confidences = boxes[idxs], class_ids[idxs], confidences[idxs]
+
+        # 坐标还原
+        boxes = scale_coords(img1_shape, boxes, img0_shape, ratio_pad=ratio_pad)
+
         detections = []
-        for detection in pred:
-            scores = detection[5:]
-            class_id = np.argmax(scores)
-            confidence = scores[class_id] * detection[4]
-
-            if confidence > self.conf_threshold:
-                box = detection[0:4]
-                (center_x, center_y, width, height) = box.astype("int")
-                x1 = int(center_x - (width / 2))
-                y1 = int(center_y - (height / 2))
-                x2 = x1 + int(width)
-                y2 = y1 + int(height)
-                
-                # 坐标还原
-                box = np.array([[x1, y1, x2, y2]], dtype=np.float32)
-                box = scale_coords((self.img_size, self.img_size), box, img0.shape[:2])
-                x1, y1, x2, y2 = map(int, box[0])
-                
-                detection = {
-                    'class': int(class_id),
-                    'class_name': self.names.get(int(class_id), str(int(class_id))),
-                    'confidence': float(confidence),
-                    'bbox': (x1, y1, x2, y2),
-                    'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
-                }
-                detections.append(detection)
-        
+        for (x1, y1, x2, y2), class_id, confidence in zip(boxes.astype(int).tolist(), class_ids, confidences):
+            detection = {
+                'class': int(class_id),
+                'class_name': self.names.get(int(class_id), str(int(class_id))),
+                'confidence': float(confidence),
+                'bbox': (x1, y1, x2, y2),
+                'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
+            }
+            detections.append(detection)
+
         return detections
 
     def detect_torch(self, frame: np.ndarray) -> List[Dict]:
         """使用PyTorch模型进行检测"""
         with torch.amp.autocast('cuda'):
-            results = self.model(frame)
+            # AutoShape内部按步长做矩形letterbox，size为最长边
+            results = self.model(frame, size=max(self.input_shape))
+            self._record_torch_timings(results)
             detections = []
             
             for *xyxy, conf, cls in results.xyxy[0].cpu().numpy():
@@ -142,6 +346,83 @@ class YOLODetector:
             
             return detections
 
+    def detect_letterboxed(self, imgs: np.ndarray, img0_shapes: List[Tuple[int, int]],
+                           ratio_pads: List[Tuple]) -> List[List[Dict]]:
+        """
+        对已经letterbox处理过的一批图像进行检测，坐标还原到原始图像
+        Args:
+            imgs: NHWC格式的uint8 BGR图像，例如DatasetCache返回的内存映射切片
+            img0_shapes: 每张图像的原始尺寸(h, w)
+            ratio_pads: 每张图像letterbox时的(缩放比例, 填充)
+        Returns:
+            每张图像的检测结果列表
+        """
+        with self._lock:
+            return self._detect_letterboxed(imgs, img0_shapes, ratio_pads)
+
+    def _detect_letterboxed(self, imgs: np.ndarray, img0_shapes: List[Tuple[int, int]],
+                            ratio_pads: List[Tuple]) -> List[List[Dict]]:
+        if self.use_onnx:
+            # 固定batch为1的模型逐张推理，否则整批推理
+            batch_dim = self.model.get_inputs()[0].shape[0]
+            step = batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else len(imgs)
+            preds = []
+            preprocess_time = inference_time = 0.0
+            t2 = time.perf_counter()
+            for i in range(0, len(imgs), step):
+                t0 = time.perf_counter()
+                tensor = self.to_tensor(imgs[i:i + step])
+                t1 = time.perf_counter()
+                preds.extend(self.model.run(None, {self.input_name: tensor})[0].astype(np.float32))
+                t2 = time.perf_counter()
+                preprocess_time += t1 - t0
+                inference_time += t2 - t1
+            img1_shape = imgs.shape[1:3]
+            batch_detections = [self.postprocess_onnx(pred, img1_shape, img0_shape, ratio_pad)
+                                for pred, img0_shape, ratio_pad in zip(preds, img0_shapes, ratio_pads)]
+            self._record_timings(0.0, preprocess_time, preprocess_time + inference_time,
+                                 preprocess_time + inference_time + time.perf_counter() - t2)
+            return batch_detections
+
+        with torch.amp.autocast('cuda'):
+            results = self.model(list(imgs), size=max(imgs.shape[1:3]))
+            self._record_torch_timings(results, len(imgs))
+            batch_detections = []
+            for xyxy, img0_shape, ratio_pad in zip(results.xyxy, img0_shapes, ratio_pads):
+                boxes = xyxy.cpu().numpy().astype(np.float32)
+                boxes[:, :4] = scale_coords(imgs.shape[1:3], boxes[:, :4], img0_shape, ratio_pad=ratio_pad)
+                detections = []
+                for *box, conf, cls in boxes:
+                    x1, y1, x2, y2 = map(int, box)
+                    detections.append({
+                        'class': int(cls),
+                        'class_name': self.names.get(int(cls), str(int(cls))),
+                        'confidence': float(conf),
+                        'bbox': (x1, y1, x2, y2),
+                        'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
+                    })
+                batch_detections.append(detections)
+            return batch_detections
+
+    def detect_cache(self, cache, batch_size: int = 8):
+        """
+        按批次遍历预处理缓存并检测
+        Args:
+            cache: DatasetCache对象
+            batch_size: 每批图像数量
+        Yields:
+            (图像索引信息, 检测结果列表)
+        """
+        if not self.dynamic and tuple(cache.img_size) != self.input_shape:
+            raise ValueError(f"缓存尺寸 {tuple(cache.img_size)} 与模型输入尺寸 {self.input_shape} 不一致")
+        for imgs, metas in cache.iter_batches(batch_size):
+            batch_detections = self.detect_letterboxed(
+                imgs,
+                [meta['shape'] for meta in metas],
+                [(meta['ratio'], meta['pad']) for meta in metas]
+            )
+            yield from zip(metas, batch_detections)
+
     def draw_detections(self, frame: np.ndarray, detections: List[Dict], depth_info: Optional[Dict] = None) -> np.ndarray:
         """
         在图像上绘制检测结果
@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from detector import YOLODetector
+from dataset_cache import list_images, load_cache
+from utils import box_iou, xywhn2xyxy
+
+# mAP@0.5:0.95 使用的IoU阈值
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def default_label_dir(image_dir: str) -> str:
+    """images/val -> labels/val，与prepare_dataset.py的目录结构一致"""
+    parts = list(Path(image_dir).parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == 'images':
+            parts[i] = 'labels'
+            return str(Path(*parts))
+    raise ValueError(f"无法从 {image_dir} 推断标签目录，请通过 --labels 指定")
+
+
+def load_labels(label_path: str, img_shape) -> np.ndarray:
+    """
+    读取YOLO格式的标签文件
+    Args:
+        label_path: 标签文件路径，每行为 class cx cy w h（归一化坐标）
+        img_shape: 原始图像尺寸(h, w)
+    Returns:
+        (N, 5) 数组，每行为 class x1 y1 x2 y2（像素坐标）
+    """
+    # 不存在或为空的标签文件表示背景图片
+    if not os.path.exists(label_path) or os.path.getsize(label_path) == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.loadtxt(label_path, dtype=np.float32, ndmin=2)
+    if labels.size == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    labels[:, 1:5] = xywhn2xyxy(labels[:, 1:5], w=img_shape[1], h=img_shape[0])
+    return labels[:, :5]
+
+
+def detections_to_array(detections: List[Dict]) -> np.ndarray:
+    """检测结果列表转换为 (M, 6) 数组，每行为 x1 y1 x2 y2 conf class"""
+    if not detections:
+        return np.zeros((0, 6), dtype=np.float32)
+    return np.array([[*det['bbox'], det['confidence'], det['class']] for det in detections], dtype=np.float32)
+
+
+def match_predictions(detections: np.ndarray, labels: np.ndarray, iouv: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    在每个IoU阈值下将检测框与标签一一匹配
+    Args:
+        detections: (M, 6) 数组，每行为 x1 y1 x2 y2 conf class
+        labels: (N, 5) 数组，每行为 class x1 y1 x2 y2
+        iouv: IoU阈值
+    Returns:
+        (M, len(iouv)) 布尔数组，表示检测框在各阈值下是否为真正例
+    """
+    correct = np.zeros((len(detections), len(iouv)), dtype=bool)
+    if not len(detections) or not len(labels):
+        return correct
+    iou = box_iou(labels[:, 1:5], detections[:, :4])
+    correct_class = labels[:, 0:1] == detections[:, 5]
+    for i, t in enumerate(iouv):
+        x = np.nonzero((iou >= t) & correct_class)  # (标签索引, 检测索引)
+        if x[0].shape[0]:
+            matches = np.stack([x[0], x[1], iou[x[0], x[1]]], axis=1)
+            if x[0].shape[0] > 1:
+                # 按IoU从大到小排序，每个检测框和每个标签只保留一次匹配
+                matches = matches[matches[:, 2].argsort()[::-1]]
+                matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+                matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+            correct[matches[:, 1].astype(int), i] = True
+    return correct
+
+
+def compute_ap(recall: np.ndarray, precision: np.ndarray) -> float:
+    """根据召回率和精确率曲线计算AP（COCO 101点插值）"""
+    # 精确率包络：召回率不低于r时能达到的最大精确率
+    mpre = np.flip(np.maximum.accumulate(np.flip(precision)))
+    x = np.linspace(0, 1, 101)
+    idx = np.searchsorted(recall, x, side='left')
+    q = np.where(idx < len(recall), mpre[np.minimum(idx, len(recall) - 1)], 0.0)
+    return float(q.mean())
+
+
+def ap_per_class(tp: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray, target_cls: np.ndarray, eps: float = 1e-16):
+    """
+    计算每个类别的精确率、召回率和AP
+    Args:
+        tp: (M, len(iouv)) 真正例标记
+        conf: (M,) 置信度
+        pred_cls: (M,) 预测类别
+        target_cls: (N,) 标签类别
+    Returns:
+        p, r: 在平均F1最大的置信度处各类别的精确率和召回率
+        ap: (nc, len(iouv)) 各类别在各IoU阈值下的AP
+        classes: 类别索引
+    """
+    i = np.argsort(-conf)
+    tp, conf, pred_cls = tp[i], conf[i], pred_cls[i]
+    classes, nt = np.unique(target_cls, return_counts=True)
+
+    px = np.linspace(0, 1, 1000)
+    ap = np.zeros((len(classes), tp.shape[1]))
+    p = np.zeros((len(classes), len(px)))
+    r = np.zeros((len(classes), len(px)))
+    for ci, c in enumerate(classes):
+        i = pred_cls == c
+        if not i.any():
+            continue
+        fpc = (1 - tp[i]).cumsum(0)
+        tpc = tp[i].cumsum(0)
+        recall = tpc / (nt[ci] + eps)
+        precision = tpc / (tpc + fpc)
+        # conf降序排列，取负号后满足np.interp的升序要求
+        r[ci] = np.interp(-px, -conf[i], recall[:, 0], left=0)
+        p[ci] = np.interp(-px, -conf[i], precision[:, 0], left=1)
+        for j in range(tp.shape[1]):
+            ap[ci, j] = compute_ap(recall[:, j], precision[:, j])
+
+    f1 = 2 * p * r / (p + r + eps)
+    best = f1.mean(0).argmax() if len(classes) else 0
+    return p[:, best], r[:, best], ap, classes.astype(int)
+
+
+def evaluate(detector: YOLODetector, image_dir: str, label_dir: Optional[str] = None, use_cache: bool = False,
+             cache_path: Optional[str] = None, batch_size: int = 8, warmup: int = 1) -> Dict:
+    """
+    在验证集上评估检测器的精度和速度
+    Args:
+        detector: 检测器
+        image_dir: 图片目录
+        label_dir: 标签目录，为None时由图片目录推断
+        use_cache: 是否使用预处理缓存（跳过解码和letterbox）
+        cache_path: 缓存路径（不含扩展名）
+        batch_size: 使用缓存时每批图像数量
+        warmup: 正式计时前的预热次数
+    Returns:
+        精度和速度指标
+    """
+    label_dir = label_dir or default_label_dir(image_dir)
+    files = list_images(image_dir)
+    if not files:
+        raise Exception(f"目录 {image_dir} 中没有图片")
+
+    stages = {'decode': 0.0, 'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+    stats = []  # 每张图的 (tp, conf, pred_cls, target_cls)
+    elapsed = 0.0
+
+    def accumulate(file, img0_shape, detections):
+        labels = load_labels(os.path.join(label_dir, Path(file).stem + '.txt'), img0_shape)
+        preds = detections_to_array(detections)
+        stats.append((match_predictions(preds, labels), preds[:, 4], preds[:, 5], labels[:, 0]))
+
+    if use_cache:
+        cache = load_cache(image_dir, cache_path, detector.img_size)
+        for _ in range(warmup):
+            imgs, metas = next(cache.iter_batches(batch_size))
+            detector.detect_letterboxed(imgs, [m['shape'] for m in metas], [(m['ratio'], m['pad']) for m in metas])
+        for imgs, metas in cache.iter_batches(batch_size):
+            t0 = time.perf_counter()
+            batch_detections = detector.detect_letterboxed(
+                imgs, [m['shape'] for m in metas], [(m['ratio'], m['pad']) for m in metas])
+            elapsed += time.perf_counter() - t0
+            for stage, t in detector.timings.items():
+                stages[stage] += t
+            for meta, detections in zip(metas, batch_detections):
+                accumulate(meta['file'], meta['shape'], detections)
+    else:
+        for _ in range(warmup):
+            detector.detect(cv2.imread(os.path.join(image_dir, files[0])))
+        for file in files:
+            t0 = time.perf_counter()
+            frame = cv2.imread(os.path.join(image_dir, file))
+            t1 = time.perf_counter()
+            detections = detector.detect(frame)
+            elapsed += time.perf_counter() - t0
+            stages['decode'] += (t1 - t0) * 1000
+            for stage, t in detector.timings.items():
+                stages[stage] += t
+            accumulate(file, frame.shape[:2], detections)
+
+    tp, conf, pred_cls, target_cls = [np.concatenate(x, 0) for x in zip(*stats)]
+    p, r, ap, classes = ap_per_class(tp, conf, pred_cls, target_cls)
+    ap50, ap_all = ap[:, 0], ap.mean(1)
+    n = len(files)
+
+    return {
+        'num_images': n,
+        'num_labels': int(len(target_cls)),
+        'metrics': {
+            'precision': float(p.mean()) if len(classes) else 0.0,
+            'recall': float(r.mean()) if len(classes) else 0.0,
+            'map50': float(ap50.mean()) if len(classes) else 0.0,
+            'map50_95': float(ap_all.mean()) if len(classes) else 0.0,
+            'per_class': {
+                detector.names.get(int(c), str(int(c))): {
+                    'labels': int((target_cls == c).sum()),
+                    'precision': float(p[i]),
+                    'recall': float(r[i]),
+                    'map50': float(ap50[i]),
+                    'map50_95': float(ap_all[i])
+                } for i, c in enumerate(classes)
+            }
+        },
+        'speed': {
+            'images_per_second': n / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {
+                **{stage: t / n for stage, t in stages.items()},
+                'total': elapsed * 1000 / n
+            }
+        }
+    }
+
+
+def print_results(results: Dict):
+    """打印评估结果"""
+    metrics, speed = results['metrics'], results['speed']
+    print(f"{'类别':<16}{'标签数':>8}{'P':>8}{'R':>8}{'mAP50':>8}{'mAP50-95':>10}")
+    print(f"{'all':<16}{results['num_labels']:>8}{metrics['precision']:>8.3f}{metrics['recall']:>8.3f}"
+          f"{metrics['map50']:>8.3f}{metrics['map50_95']:>10.3f}")
+    for name, m in metrics['per_class'].items():
+        print(f"{name:<16}{m['labels']:>8}{m['precision']:>8.3f}{m['recall']:>8.3f}"
+              f"{m['map50']:>8.3f}{m['map50_95']:>10.3f}")
+    latency = ', '.join(f"{stage} {t:.2f}ms" for stage, t in speed['latency_ms'].items())
+    print(f"速度: {speed['images_per_second']:.1f} 张/秒 ({latency})")
+
+
+def main(opt):
+    use_onnx = opt.weights.endswith('.onnx')
+    iou_threshold = None if opt.no_nms else opt.iou_thres
+    detector = YOLODetector(opt.weights, yaml_path=opt.data, conf_threshold=opt.conf_thres,
+                            use_onnx=use_onnx, iou_threshold=iou_threshold, img_size=opt.img_size[0],
+                            auto=opt.rect)
+
+    if detector.dynamic:
+        img_sizes = opt.img_size
+    else:
+        # 静态形状的模型只能在模型声明的尺寸下评估
+        img_sizes = [detector.img_size]
+        if len(opt.img_size) > 1:
+            print(f"模型输入尺寸固定为 {detector.input_shape}，忽略尺寸扫描 {opt.img_size}")
+    # 记录实际使用的letterbox方式：缓存中的图像均为方形；PyTorch模型由AutoShape始终做矩形letterbox，
+    # 不受--rect影响；ONNX模型只有动态形状时--rect才生效
+    rect = not opt.cache and (not use_onnx or (opt.rect and detector.dynamic))
+    if opt.rect and opt.cache:
+        print("使用缓存时不支持矩形letterbox，按方形输入评估")
+
+    runs = []
+    for img_size in img_sizes:
+        detector.set_img_size(img_size)
+        # 多个尺寸时每个尺寸使用独立的缓存，避免互相覆盖
+        cache_path = None
+        if len(img_sizes) > 1:
+            cache_path = f"{Path(opt.images).resolve()}_{img_size}.cache"
+        results = evaluate(detector, opt.images, opt.labels, use_cache=opt.cache, cache_path=cache_path,
+                           batch_size=opt.batch_size, warmup=opt.warmup)
+        results = {
+            'model': os.path.basename(opt.weights),
+            'backend': 'onnx' if use_onnx else 'torch',
+            'img_size': detector.img_size,
+            'rect': rect,
+            'conf_thres': opt.conf_thres,
+            'iou_thres': iou_threshold,
+            'cache': opt.cache,
+            **results
+        }
+        print(f"\n输入尺寸: {detector.img_size}{'（矩形）' if results['rect'] else ''}")
+        print_results(results)
+        runs.append(results)
+
+    Path(opt.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(opt.output, 'w', encoding='utf-8') as f:
+        # 单个尺寸时保存为对象，多个尺寸时保存为列表
+        json.dump(runs[0] if len(runs) == 1 else runs, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {opt.output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='在验证集上评估模型精度(mAP)和速度')
+    parser.add_argument('--weights', type=str, default='models/best.onnx', help='模型路径(.pt/.onnx)')
+    parser.add_argument('--data', type=str, default='datasets/custom.yaml', help='数据集配置文件')
+    parser.add_argument('--images', type=str, default='datasets/images/val', help='验证集图片目录')
+    parser.add_argument('--labels', type=str, default=None, help='验证集标签目录，默认由图片目录推断')
+    parser.add_argument('--img-size', nargs='+', type=int, default=[640], help='inference size(s) (pixels)，多个尺寸时逐一评估')
+    parser.add_argument('--rect', default=False, action='store_true', help='矩形letterbox（仅动态形状的ONNX模型，PyTorch模型始终为矩形）')
+    parser.add_argument('--conf-thres', type=float, default=0.001, help='object confidence threshold')
+    parser.add_argument('--iou-thres', type=float, default=0.45, help='IOU threshold for NMS')
+    parser.add_argument('--no-nms', default=False, action='store_true', help='ONNX模型跳过NMS')
+    parser.add_argument('--cache', default=False, action='store_true', help='使用预处理缓存')
+    parser.add_argument('--batch-size', type=int, default=8, help='使用缓存时每批图像数量')
+    parser.add_argument('--warmup', type=int, default=1, help='正式计时前的预热次数')
+    parser.add_argument('--output', type=str, default='runs/eval/results.json', help='结果JSON路径')
+    opt = parser.parse_args()
+    main(opt)
@@ -0,0 +1,646 @@
+import json
+import time
+import argparse
+import multiprocessing as mp
+from collections import namedtuple
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+from utils import summarize
+
+# 共享内存中各区域按64字节对齐
+ALIGN = 64
+BUS_HEADER_DTYPE = np.dtype([
+    ('write_seq', '<u8'), ('slots', '<u4'), ('height', '<u4'), ('width', '<u4'),
+    ('channels', '<u4'), ('has_depth', '<u4'), ('depth_scale', '<f8'), ('start_ns', '<u8')
+])
+SLOT_HEADER_DTYPE = np.dtype([('seq', '<u8'), ('timestamp_ns', '<u8')])
+# 每帧最多回传的检测数，每个检测为 class conf x1 y1 x2 y2 depth
+MAX_DETECTIONS = 64
+RESULT_HEADER_DTYPE = np.dtype([('write_seq', '<u8'), ('slots', '<u4')])
+RESULT_DTYPE = np.dtype([
+    ('seq', '<u8'), ('frame_seq', '<u8'), ('capture_ns', '<u8'), ('done_ns', '<u8'),
+    ('worker', '<u4'), ('count', '<u4'), ('boxes', '<f4', (MAX_DETECTIONS, 7))
+])
+
+FrameSlot = namedtuple('FrameSlot', ['seq', 'timestamp_ns', 'frame', 'depth'])
+
+
+def aligned(n: int) -> int:
+    """向上对齐到ALIGN字节"""
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class FrameBus:
+    """
+    共享内存帧总线
+    采集进程将彩色帧（及深度帧）写入固定数量的槽位，写满后覆盖最旧的槽位；
+    检测进程直接在共享内存上读取最新帧，无需拷贝。每个槽位带有序号，
+    写入时先将序号置0，写完后再写入新序号，读取方据此判断帧是否完整、处理期间是否被覆盖。
+    """
+    def __init__(self, name: str, shape: Optional[Tuple[int, int, int]] = None, depth: bool = False,
+                 slots: int = 8, depth_scale: float = 0.001, create: bool = False):
+        """
+        创建或连接帧总线
+        Args:
+            name: 共享内存名称
+            shape: 彩色帧形状(h, w, c)，仅创建时需要
+            depth: 是否同时传输深度帧(h, w, uint16)，仅创建时需要
+            slots: 槽位数，仅创建时需要
+            depth_scale: 深度值单位（米/原始单位），仅创建时需要
+            create: 是否创建，为False时连接已有的帧总线
+        """
+        self.name = name
+        self.create = create
+        header_size = aligned(BUS_HEADER_DTYPE.itemsize)
+        if create:
+            h, w, c = shape
+            slot_headers_size = aligned(slots * SLOT_HEADER_DTYPE.itemsize)
+            frames_size = aligned(slots * h * w * c)
+            depths_size = aligned(slots * h * w * 2) if depth else 0
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=header_size + slot_headers_size + frames_size + depths_size)
+            self.header = np.ndarray((), dtype=BUS_HEADER_DTYPE, buffer=self.shm.buf)
+            self.header['write_seq'] = 0
+            self.header['start_ns'] = 0
+            self.header['slots'], self.header['height'], self.header['width'], self.header['channels'] = slots, h, w, c
+            self.header['has_depth'] = int(depth)
+            self.header['depth_scale'] = depth_scale
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.header = np.ndarray((), dtype=BUS_HEADER_DTYPE, buffer=self.shm.buf)
+
+        self.slots = int(self.header['slots'])
+        h, w, c = int(self.header['height']), int(self.header['width']), int(self.header['channels'])
+        self.shape = (h, w, c)
+        self.depth_scale = float(self.header['depth_scale'])
+        offset = header_size
+        self.slot_headers = np.ndarray((self.slots,), dtype=SLOT_HEADER_DTYPE, buffer=self.shm.buf, offset=offset)
+        offset += aligned(self.slots * SLOT_HEADER_DTYPE.itemsize)
+        self.frames = np.ndarray((self.slots, h, w, c), dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+        offset += aligned(self.slots * h * w * c)
+        if self.header['has_depth']:
+            self.depths = np.ndarray((self.slots, h, w), dtype='<u2', buffer=self.shm.buf, offset=offset)
+        else:
+            self.depths = None
+        self.write_seq = int(self.header['write_seq'])
+
+    def publish(self, frame: np.ndarray, depth: Optional[np.ndarray] = None,
+                timestamp_ns: Optional[int] = None) -> int:
+        """
+        写入一帧，覆盖最旧的槽位
+        Args:
+            frame: 彩色帧，形状必须与总线一致
+            depth: 深度帧，总线未启用深度时忽略
+            timestamp_ns: 采集时间戳（单调时钟纳秒），默认为当前时间
+        Returns:
+            该帧的序号
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"帧形状 {frame.shape} 与帧总线形状 {self.shape} 不一致")
+        seq = self.write_seq + 1
+        i = (seq - 1) % self.slots
+        self.slot_headers['seq'][i] = 0
+        np.copyto(self.frames[i], frame)
+        if self.depths is not None and depth is not None:
+            np.copyto(self.depths[i], depth)
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.slot_headers['timestamp_ns'][i] = timestamp_ns
+        if seq == 1:
+            # 第一帧的时间作为吞吐量统计的起点，不计入进程启动时间
+            self.header['start_ns'] = timestamp_ns
+        self.slot_headers['seq'][i] = seq
+        self.header['write_seq'] = seq
+        self.write_seq = seq
+        return seq
+
+    def read_latest(self, after_seq: int = 0, modulo: int = 1, remainder: int = 0) -> Optional[FrameSlot]:
+        """
+        获取最新的一帧（零拷贝视图）
+        Args:
+            after_seq: 只返回序号大于该值的帧
+            modulo, remainder: 只返回序号满足 seq % modulo == remainder 的帧，用于多个检测进程分摊帧
+        Returns:
+            FrameSlot，没有新帧时返回None；处理完后应调用is_current()确认帧未被覆盖
+        """
+        latest = int(self.header['write_seq'])
+        seq = latest - (latest - remainder) % modulo
+        if seq <= 0 or seq <= after_seq or seq <= latest - self.slots:
+            return None
+        i = (seq - 1) % self.slots
+        if self.slot_headers['seq'][i] != seq:
+            return None
+        depth = self.depths[i] if self.depths is not None else None
+        return FrameSlot(seq, int(self.slot_headers['timestamp_ns'][i]), self.frames[i], depth)
+
+    def is_current(self, seq: int) -> bool:
+        """序号为seq的帧是否仍未被覆盖"""
+        return self.slot_headers['seq'][(seq - 1) % self.slots] == seq
+
+    def close(self):
+        """断开共享内存，创建方同时释放共享内存"""
+        self.header = self.slot_headers = self.frames = self.depths = None
+        self.shm.close()
+        if self.create:
+            self.shm.unlink()
+
+
+class ResultBus:
+    """检测结果总线，每个检测进程写入自己的结果环形缓冲区，写满后覆盖最旧的结果"""
+    def __init__(self, name: str, slots: int = 64, create: bool = False):
+        """
+        创建或连接结果总线
+        Args:
+            name: 共享内存名称
+            slots: 槽位数，仅创建时需要
+            create: 是否创建
+        """
+        self.name = name
+        self.create = create
+        header_size = aligned(RESULT_HEADER_DTYPE.itemsize)
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=header_size + slots * RESULT_DTYPE.itemsize)
+            self.header = np.ndarray((), dtype=RESULT_HEADER_DTYPE, buffer=self.shm.buf)
+            self.header['write_seq'] = 0
+            self.header['slots'] = slots
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.header = np.ndarray((), dtype=RESULT_HEADER_DTYPE, buffer=self.shm.buf)
+        self.slots = int(self.header['slots'])
+        self.records = np.ndarray((self.slots,), dtype=RESULT_DTYPE, buffer=self.shm.buf, offset=header_size)
+        self.write_seq = int(self.header['write_seq'])
+        self.last_seq = max(0, self.write_seq - self.slots)
+        # 读取过慢被覆盖的结果数
+        self.lost = 0
+
+    def publish(self, frame: FrameSlot, detections: List[Dict], depth_info: Optional[Dict] = None,
+                worker: int = 0):
+        """
+        写入一帧的检测结果
+        Args:
+            frame: 检测所用的帧
+            detections: 检测结果列表，超过MAX_DETECTIONS的部分被截断
+            depth_info: 深度信息字典，键为检测索引，值为深度值（米）
+            worker: 检测进程编号
+        """
+        seq = self.write_seq + 1
+        record = self.records[(seq - 1) % self.slots]
+        record['seq'] = 0
+        count = min(len(detections), MAX_DETECTIONS)
+        for i, det in enumerate(detections[:count]):
+            depth = depth_info.get(i, np.nan) if depth_info else np.nan
+            record['boxes'][i] = (det['class'], det['confidence'], *det['bbox'], depth)
+        record['frame_seq'] = frame.seq
+        record['capture_ns'] = frame.timestamp_ns
+        record['done_ns'] = time.monotonic_ns()
+        record['worker'] = worker
+        record['count'] = count
+        record['seq'] = seq
+        self.header['write_seq'] = seq
+        self.write_seq = seq
+
+    def read_new(self) -> List[np.void]:
+        """读取上次读取之后的新结果（拷贝）"""
+        latest = int(self.header['write_seq'])
+        first = max(self.last_seq + 1, latest - self.slots + 1)
+        self.lost += first - (self.last_seq + 1)
+        results = []
+        for seq in range(first, latest + 1):
+            i = (seq - 1) % self.slots
+            record = self.records[i].copy()
+            # 拷贝后序号不变才说明拷贝期间未被覆盖
+            if record['seq'] != seq or self.records['seq'][i] != seq:
+                self.lost += 1
+                continue
+            results.append(record)
+        self.last_seq = max(self.last_seq, latest)
+        return results
+
+    def close(self):
+        """断开共享内存，创建方同时释放共享内存"""
+        self.header = self.records = None
+        self.shm.close()
+        if self.create:
+            self.shm.unlink()
+
+
+def record_to_detections(record: np.void, names: Dict) -> Tuple[List[Dict], Dict]:
+    """将结果记录还原为YOLODetector格式的检测结果和深度信息"""
+    detections, depth_info = [], {}
+    for i, (cls, conf, x1, y1, x2, y2, depth) in enumerate(record['boxes'][:record['count']]):
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        detections.append({
+            'class': int(cls),
+            'class_name': names.get(int(cls), str(int(cls))),
+            'confidence': float(conf),
+            'bbox': (x1, y1, x2, y2),
+            'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
+        })
+        if not np.isnan(depth):
+            depth_info[i] = float(depth)
+    return detections, depth_info
+
+
+def make_camera(spec: Dict):
+    """根据描述创建摄像头，摄像头对象无法跨进程传递，需在采集进程中创建"""
+    from cameras import WebCamera, RealSenseCamera, ReplayCamera
+    if spec['type'] == 'web':
+        return WebCamera(camera_id=spec.get('camera_id', 0))
+    if spec['type'] == 'realsense':
+        return RealSenseCamera(enable_depth=spec.get('enable_depth', True))
+    return ReplayCamera(spec['path'], realtime=spec.get('realtime', False), loop=spec.get('loop', False),
+                        drop_late=spec.get('drop_late', False))
+
+
+def probe_camera(spec: Dict, timeout: float = 5.0) -> Tuple[Tuple[int, int, int], bool, float]:
+    """
+    打开摄像头读取一帧，获取帧形状、是否有深度帧以及深度单位，用于创建帧总线
+    Args:
+        spec: 摄像头描述
+        timeout: 等待第一帧的最长时间（秒）
+    """
+    camera = make_camera({**spec, 'realtime': False})
+    camera.start()
+    try:
+        deadline = time.monotonic() + timeout
+        frame = camera.get_frame()
+        while frame is None:
+            if not camera.is_running or time.monotonic() > deadline:
+                raise Exception(f"无法从摄像头 {spec['type']} 读取帧")
+            time.sleep(0.01)
+            frame = camera.get_frame()
+        depth = getattr(camera, 'enable_depth', False)
+        return frame.shape, depth, getattr(camera, 'depth_scale', 0.001)
+    finally:
+        camera.stop()
+
+
+def load_names(yaml_path: str) -> Dict:
+    """读取数据集配置文件中的类别名称"""
+    try:
+        with open(yaml_path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f).get('names', {})
+    except Exception:
+        return {}
+
+
+def capture_process(bus_name: str, camera_spec: Dict, stop_event, done_event, max_frames: int = 0,
+                    result_names: Optional[List[str]] = None):
+    """
+    采集进程：读取摄像头帧并写入帧总线
+    Args:
+        result_names: 各检测进程的结果总线名称，指定时启用背压：分配给某个检测进程的上一帧处理完后
+            才写入分配给它的下一帧，用于测试最大吞吐量
+    """
+    bus = FrameBus(bus_name)
+    results = [ResultBus(name) for name in result_names or []]
+    assigned = [0] * len(results)
+    camera = make_camera(camera_spec)
+    camera.start()
+    try:
+        while not stop_event.is_set() and (not max_frames or bus.write_seq < max_frames):
+            frame = camera.get_frame()
+            if frame is None:
+                if not camera.is_running:
+                    break
+                continue
+            # 帧到达时间，回放时由ReplayCamera按录制时间戳给出
+            timestamp_ns = getattr(camera, 'frame_time_ns', None) or time.monotonic_ns()
+            if results:
+                worker = (bus.write_seq + 1) % len(results)
+                while int(results[worker].header['write_seq']) < assigned[worker] and not stop_event.is_set():
+                    time.sleep(0.0002)
+                assigned[worker] += 1
+            depth = camera.get_depth_frame() if getattr(camera, 'enable_depth', False) else None
+            bus.publish(frame, depth, timestamp_ns)
+    finally:
+        camera.stop()
+        for result_bus in results:
+            result_bus.close()
+        bus.close()
+        done_event.set()
+
+
+def detector_process(bus_name: str, result_name: str, worker: int, num_workers: int, detector_args: Dict,
+                     stop_event, ready_event):
+    """检测进程：从帧总线读取分配给自己的最新帧，检测后将结果写入结果总线"""
+    from detector import YOLODetector
+    detector = YOLODetector(**detector_args)
+    bus = FrameBus(bus_name)
+    results = ResultBus(result_name)
+    detector.warmup([bus.shape[:2]])
+    ready_event.set()
+    last_seq = 0
+    frame = None
+    try:
+        while not stop_event.is_set():
+            frame = bus.read_latest(last_seq, modulo=num_workers, remainder=worker % num_workers)
+            if frame is None:
+                time.sleep(0.0005)
+                continue
+            last_seq = frame.seq
+            detections = detector.detect(frame.frame)
+            depth_info = {}
+            if frame.depth is not None:
+                h, w = frame.depth.shape
+                for i, det in enumerate(detections):
+                    x, y = det['center']
+                    if 0 <= x < w and 0 <= y < h:
+                        depth_info[i] = float(frame.depth[y, x]) * bus.depth_scale
+            # 检测期间帧被覆盖时结果不可信，直接丢弃
+            if not bus.is_current(frame.seq):
+                continue
+            results.publish(frame, detections, depth_info, worker)
+    finally:
+        # 释放共享内存上的视图后才能断开连接
+        frame = None
+        results.close()
+        bus.close()
+
+
+class FrameBusPipeline:
+    """多进程检测流程：一个采集进程写帧总线，多个检测进程读帧总线并回传结果"""
+    def __init__(self, camera_spec: Dict, detector_args: Dict, num_workers: int = 2, slots: int = 8,
+                 name: str = 'yolo_frame_bus', max_frames: int = 0, backpressure: bool = False):
+        """
+        初始化多进程检测流程
+        Args:
+            camera_spec: 摄像头描述，见make_camera()
+            detector_args: 传给YOLODetector的参数
+            num_workers: 检测进程数
+            slots: 帧总线槽位数
+            name: 共享内存名称前缀
+            max_frames: 最多采集的帧数，0表示不限制
+            backpressure: 采集进程是否等待检测进程处理完再写入下一帧，见capture_process()
+        """
+        if backpressure and slots < num_workers:
+            raise ValueError(f"启用背压时槽位数 {slots} 不能少于检测进程数 {num_workers}")
+        self.camera_spec = camera_spec
+        self.detector_args = detector_args
+        self.num_workers = num_workers
+        self.slots = slots
+        self.name = name
+        self.max_frames = max_frames
+        self.backpressure = backpressure
+        self.ctx = mp.get_context('spawn')
+        self.bus = None
+        self.result_buses = []
+        self.processes = []
+        self.stop_event = None
+        self.capture_done = None
+
+    def start(self, timeout: float = 120.0):
+        """
+        创建共享内存，启动检测进程（预热完成后）和采集进程
+        Args:
+            timeout: 等待检测进程加载模型并预热的最长时间（秒）
+        """
+        try:
+            shape, depth, depth_scale = probe_camera(self.camera_spec)
+            self.bus = FrameBus(self.name, shape, depth, self.slots, depth_scale, create=True)
+            for i in range(self.num_workers):
+                self.result_buses.append(ResultBus(f"{self.name}_r{i}", create=True))
+            self.stop_event = self.ctx.Event()
+            self.capture_done = self.ctx.Event()
+
+            ready_events = []
+            for i in range(self.num_workers):
+                ready = self.ctx.Event()
+                p = self.ctx.Process(target=detector_process, name=f"detector-{i}", daemon=True,
+                                     args=(self.name, f"{self.name}_r{i}", i, self.num_workers, self.detector_args,
+                                           self.stop_event, ready))
+                p.start()
+                self.processes.append(p)
+                ready_events.append(ready)
+            # 检测进程加载模型失败时会直接退出，不能无限等待
+            deadline = time.monotonic() + timeout
+            for p, ready in zip(self.processes, ready_events):
+                while not ready.wait(0.1):
+                    if not p.is_alive():
+                        raise Exception(f"检测进程 {p.name} 启动失败（退出码 {p.exitcode}）")
+                    if time.monotonic() > deadline:
+                        raise Exception(f"检测进程 {p.name} 在 {timeout}s 内未完成预热")
+
+            result_names = [bus.name for bus in self.result_buses] if self.backpressure else None
+            p = self.ctx.Process(target=capture_process, name='capture', daemon=True,
+                                 args=(self.name, self.camera_spec, self.stop_event, self.capture_done,
+                                       self.max_frames, result_names))
+            p.start()
+            self.processes.append(p)
+        except BaseException:
+            self.stop()
+            raise
+
+    def read_results(self) -> List[np.void]:
+        """读取所有检测进程的新结果，按帧序号排序"""
+        results = [r for bus in self.result_buses for r in bus.read_new()]
+        return sorted(results, key=lambda r: int(r['frame_seq']))
+
+    def stop(self):
+        """停止所有进程并释放共享内存，也用于清理启动到一半失败的流程"""
+        if self.stop_event is not None:
+            self.stop_event.set()
+        for p in self.processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.processes = []
+        for bus in self.result_buses:
+            bus.close()
+        self.result_buses = []
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+
+def run_frame_bus(camera_spec: Dict, detector_args: Dict, num_workers: int, duration: float = 0,
+                  max_frames: int = 0, sink=None, backpressure: bool = False) -> Dict:
+    """
+    运行多进程检测流程并统计吞吐量和延迟
+    Args:
+        camera_spec: 摄像头描述
+        detector_args: 传给YOLODetector的参数
+        num_workers: 检测进程数
+        duration: 运行时长（秒），0表示直到采集结束
+        max_frames: 最多采集的帧数，0表示不限制
+        sink: 可选的DetectionSink，用于输出检测结果
+        backpressure: 采集进程是否等待检测进程处理完再写入下一帧
+    Returns:
+        统计结果，耗时从第一帧写入帧总线开始计算，延迟为帧到达到检测完成的时间
+    """
+    names = load_names(detector_args.get('yaml_path') or '')
+    pipeline = FrameBusPipeline(camera_spec, detector_args, num_workers, max_frames=max_frames,
+                                backpressure=backpressure)
+    pipeline.start()
+    latencies = []
+    processed = set()
+    last_done_ns = 0
+    t_begin = time.perf_counter()
+    t_last_result = t_begin
+    try:
+        while True:
+            now = time.perf_counter()
+            if duration and now - t_begin >= duration:
+                break
+            # 采集结束且一段时间内没有新结果时退出
+            if pipeline.capture_done.is_set() and now - t_last_result > 0.5:
+                break
+            results = pipeline.read_results()
+            if not results:
+                time.sleep(0.001)
+                continue
+            t_last_result = now
+            for record in results:
+                processed.add(int(record['frame_seq']))
+                latencies.append((int(record['done_ns']) - int(record['capture_ns'])) / 1e6)
+                last_done_ns = max(last_done_ns, int(record['done_ns']))
+                if sink is not None:
+                    sink.emit(*record_to_detections(record, names))
+        capture = pipeline.processes[-1]
+        if pipeline.capture_done.is_set():
+            capture.join(timeout=1)
+        if capture.exitcode:
+            raise Exception(f"采集进程异常退出（退出码 {capture.exitcode}）")
+        start_ns = int(pipeline.bus.header['start_ns'])
+        elapsed = (last_done_ns - start_ns) / 1e9 if last_done_ns else 0.0
+        captured = int(pipeline.bus.header['write_seq'])
+        lost = sum(bus.lost for bus in pipeline.result_buses)
+    finally:
+        pipeline.stop()
+
+    return {
+        'workers': num_workers,
+        'frames_captured': captured,
+        'frames_processed': len(processed),
+        'frames_skipped': captured - len(processed),
+        'results_lost': lost,
+        'fps': len(processed) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': summarize(latencies)
+    }
+
+
+def run_single_process(camera_spec: Dict, detector_args: Dict, max_frames: int = 0) -> Dict:
+    """
+    单进程基线：在同一进程中采集、检测并读取深度，与检测进程的工作内容一致
+    统计口径与run_frame_bus()相同：耗时从第一帧到达开始计算，延迟为帧到达到检测完成的时间
+    """
+    from detector import YOLODetector
+    detector = YOLODetector(**detector_args)
+    # 在开始回放前预热，避免预热期间按时间间隔回放的帧被跳过
+    shape, _, _ = probe_camera(camera_spec)
+    detector.warmup([shape[:2]])
+    camera = make_camera(camera_spec)
+    camera.start()
+    latencies = []
+    start_ns = done_ns = 0
+    try:
+        # 与采集进程一样按采集的帧数（含跳过的帧）限制
+        while not max_frames or len(latencies) + getattr(camera, 'dropped', 0) < max_frames:
+            frame = camera.get_frame()
+            if frame is None:
+                break
+            arrival_ns = getattr(camera, 'frame_time_ns', None) or time.monotonic_ns()
+            start_ns = start_ns or arrival_ns
+            detections = detector.detect(frame)
+            if getattr(camera, 'enable_depth', False):
+                for det in detections:
+                    camera.get_depth_at_point(*det['center'])
+            done_ns = time.monotonic_ns()
+            latencies.append((done_ns - arrival_ns) / 1e6)
+        elapsed = (done_ns - start_ns) / 1e9
+        skipped = getattr(camera, 'dropped', 0)
+    finally:
+        camera.stop()
+    return {
+        'workers': 0,
+        'frames_captured': len(latencies) + skipped,
+        'frames_processed': len(latencies),
+        'frames_skipped': skipped,
+        'fps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': summarize(latencies)
+    }
+
+
+def print_stats(title: str, stats: Dict):
+    latency = stats['latency_ms']
+    skipped = f"，跳过 {stats['frames_skipped']} 帧" if 'frames_skipped' in stats else ""
+    print(f"{title}: 处理 {stats['frames_processed']} 帧{skipped}，{stats['fps']:.1f} FPS，"
+          f"延迟 平均 {latency['mean']:.2f}ms p50 {latency['p50']:.2f}ms p95 {latency['p95']:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='共享内存帧总线：采集进程与多个检测进程')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in [('run', '运行多进程检测'), ('bench', '对比单进程与多进程的吞吐量和延迟')]:
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument('--camera', choices=['web', 'realsense', 'replay'], default='replay', help='摄像头类型')
+        sub.add_argument('--camera-id', type=int, default=0, help='普通摄像头ID')
+        sub.add_argument('--no-depth', default=False, action='store_true', help='不读取深度帧')
+        sub.add_argument('--recording', type=str, default='recordings/capture.rec', help='回放的录制文件路径')
+        sub.add_argument('--realtime', default=False, action='store_true', help='按录制时间间隔回放')
+        sub.add_argument('--weights', type=str, default='models/best.onnx', help='模型路径(.pt/.onnx)')
+        sub.add_argument('--data', type=str, default='datasets/custom.yaml', help='数据集配置文件')
+        sub.add_argument('--img-size', type=int, default=640, help='inference size (pixels)')
+        sub.add_argument('--rect', default=False, action='store_true', help='矩形letterbox（仅动态形状的ONNX模型，PyTorch模型始终为矩形）')
+        sub.add_argument('--conf-thres', type=float, default=0.75, help='object confidence threshold')
+        sub.add_argument('--workers', nargs='+', type=int, default=[2], help='检测进程数，bench时可指定多个')
+        sub.add_argument('--frames', type=int, default=0, help='最多采集的帧数，0表示不限制')
+        sub.add_argument('--duration', type=float, default=0, help='运行时长（秒），0表示直到采集结束')
+        sub.add_argument('--output', type=str, default=None, help='结果JSON路径')
+        if command == 'bench':
+            sub.add_argument('--mode', choices=['realtime', 'throughput'], default='realtime',
+                             help='realtime: 按录制时间间隔回放，处理不及时的帧被跳过; '
+                                  'throughput: 尽可能快地回放，采集等待检测完成后再提供下一帧')
+    opt = parser.parse_args()
+
+    if opt.camera == 'web':
+        camera_spec = {'type': 'web', 'camera_id': opt.camera_id}
+    elif opt.camera == 'realsense':
+        camera_spec = {'type': 'realsense', 'enable_depth': not opt.no_depth}
+    else:
+        camera_spec = {'type': 'replay', 'path': opt.recording, 'realtime': opt.realtime}
+    detector_args = {
+        'model_path': opt.weights,
+        'yaml_path': opt.data,
+        'conf_threshold': opt.conf_thres,
+        'use_onnx': opt.weights.endswith('.onnx'),
+        'img_size': opt.img_size,
+        'auto': opt.rect
+    }
+
+    runs = []
+    if opt.command == 'run':
+        from sinks import ConsoleSink
+        with ConsoleSink(change_only=True) as sink:
+            stats = run_frame_bus(camera_spec, detector_args, opt.workers[0], opt.duration, opt.frames, sink)
+        print_stats(f"{opt.workers[0]}个检测进程", stats)
+        runs.append(stats)
+    else:
+        if opt.camera != 'replay':
+            raise Exception("对比测试需要使用录制文件回放，以保证输入一致")
+        # 两种方式使用相同的回放节奏：realtime模拟实时摄像头，throughput下两者都不会跳帧
+        realtime = opt.mode == 'realtime'
+        camera_spec.update(realtime=realtime, drop_late=realtime)
+        stats = run_single_process(camera_spec, detector_args, opt.frames)
+        print_stats("单进程", stats)
+        runs.append({'mode': opt.mode, **stats})
+        for workers in opt.workers:
+            stats = run_frame_bus(camera_spec, detector_args, workers, opt.duration, opt.frames,
+                                  backpressure=not realtime)
+            print_stats(f"{workers}个检测进程", stats)
+            runs.append({'mode': opt.mode, **stats})
+
+    if opt.output:
+        Path(opt.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(opt.output, 'w', encoding='utf-8') as f:
+            json.dump(runs, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {opt.output}")
+
+
+if __name__ == '__main__':
+    main()
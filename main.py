@@ -1,8 +1,49 @@
 import cv2
 import time
 import os
-from cameras import WebCamera, RealSenseCamera
+from cameras import WebCamera, RealSenseCamera, ReplayCamera
 from detector import YOLODetector
+from resolution import AdaptiveResolution
+from sinks import ConsoleSink
+
+def annotate_frame(detector, camera, frame, detections):
+    """
+    获取检测目标的深度信息，左右翻转图像并绘制检测结果
+    Args:
+        detector: 检测器
+        camera: 摄像头，启用深度检测时从中读取深度
+        frame: 原始图像
+        detections: 检测结果列表，坐标会被修改为翻转后的坐标
+    Returns:
+        (绘制后的图像, 深度信息字典)
+    """
+    # 先获取深度信息（在翻转前，使用原始坐标）
+    depth_info = {}
+    if getattr(camera, 'enable_depth', False):
+        for i, det in enumerate(detections):
+            center_x, center_y = det['center']
+            depth = camera.get_depth_at_point(center_x, center_y)
+            if depth is not None:
+                depth_info[i] = depth  # RealSense返回的就是米
+
+    # 左右翻转图像
+    frame = cv2.flip(frame, 1)
+    
+    # 调整检测框坐标以匹配翻转后的图像
+    for det in detections:
+        # 获取图像宽度
+        img_width = frame.shape[1]
+        # 翻转边界框坐标
+        x1, y1, x2, y2 = det['bbox']
+        det['bbox'] = (img_width - x2, y1, img_width - x1, y2)
+        # 翻转中心点坐标
+        center_x, center_y = det['center']
+        det['center'] = (img_width - center_x, center_y)
+
+    # 绘制检测结果
+    frame = detector.draw_detections(frame, detections, depth_info)
+
+    return frame, depth_info
 
 def main():
     # 获取当前脚本所在目录
@@ -16,24 +57,39 @@ def main():
     use_onnx = model_choice == "2"
     
     # 设置模型路径
-    if use_onnx:
-        model_path = os.path.join(current_dir, "models", "best.onnx")
-    else:
-        model_path = os.path.join(current_dir, "models", "best.pt")
+    model_paths = {
+        False: os.path.join(current_dir, "models", "best.pt"),
+        True: os.path.join(current_dir, "models", "best.onnx")
+    }
+    model_path = model_paths[use_onnx]
     
     # 初始化检测器
     yaml_path = os.path.join(current_dir, "datasets", "custom.yaml")
-    detector = YOLODetector(model_path, yaml_path=yaml_path, conf_threshold=0.75, use_onnx=use_onnx)
+    # 动态形状模型使用矩形letterbox，减少灰色填充区域的计算量
+    detector = YOLODetector(model_path, yaml_path=yaml_path, conf_threshold=0.75, use_onnx=use_onnx, auto=True)
+
+    # 自适应分辨率（仅支持动态输入尺寸的模型）
+    resolution = None
+    if detector.dynamic:
+        print("\n是否启用自适应分辨率（负载高时降低输入尺寸以维持30FPS）？")
+        print("1. 是")
+        print("2. 否")
+        if input("请输入选择（1或2）：") == "1":
+            resolution = AdaptiveResolution(detector, target_fps=30)
 
     # 选择摄像头类型
     print("\n请选择摄像头类型：")
     print("1. 普通摄像头")
     print("2. RealSense摄像头")
-    choice = input("请输入选择（1或2）：")
+    print("3. 回放录制文件")
+    choice = input("请输入选择（1、2或3）：")
 
     # 初始化摄像头
     if choice == "1":
         camera = WebCamera(camera_id=0)
+    elif choice == "3":
+        recording_path = input("请输入录制文件路径：").strip()
+        camera = ReplayCamera(recording_path, realtime=True)
     else:
         # 询问是否启用深度检测
         print("\n是否启用深度检测？")
@@ -43,9 +99,20 @@ def main():
         enable_depth = depth_choice == "1"
         camera = RealSenseCamera(enable_depth=enable_depth)
 
+    def on_model_swapped(success):
+        """模型热切换完成后的回调"""
+        if success:
+            print(f"已切换到{'ONNX' if detector.use_onnx else 'PyTorch'}模型")
+
+    # 检测结果输出，只在结果变化时打印；可替换为JsonLinesSink、UdpSink等
+    sink = ConsoleSink(change_only=True)
+    # 预热及热切换时模拟的输入帧尺寸，读取到第一帧后确定
+    warmup_shapes = None
+
     try:
         # 启动摄像头
         camera.start()
+        sink.start()
         print("摄像头已启动")
         if isinstance(camera, RealSenseCamera):
             print(f"深度检测状态: {'已启用' if camera.enable_depth else '已禁用'}")
@@ -54,55 +121,55 @@ def main():
             # 获取图像帧
             frame = camera.get_frame()
             if frame is None:
+                # 回放结束等情况下摄像头会自行停止
+                if not camera.is_running:
+                    break
                 continue
 
+            # 按第一帧的实际尺寸预热模型，矩形letterbox下输入张量形状随帧尺寸变化
+            if warmup_shapes is None:
+                warmup_shapes = [frame.shape[:2]]
+                print("正在预热模型...")
+                if resolution is not None:
+                    resolution.warmup(warmup_shapes)
+                else:
+                    detector.warmup(warmup_shapes)
+
             # 执行检测
+            t0 = time.perf_counter()
             detections = detector.detect(frame)
+            if resolution is not None:
+                new_size = resolution.update((time.perf_counter() - t0) * 1000)
+                if new_size is not None:
+                    print(f"输入尺寸调整为 {new_size}")
             
-            # 先获取深度信息（在翻转前，使用原始坐标）
-            depth_info = {}
-            if isinstance(camera, RealSenseCamera) and camera.enable_depth:
-                for i, det in enumerate(detections):
-                    center_x, center_y = det['center']
-                    depth = camera.get_depth_at_point(center_x, center_y)
-                    if depth is not None:
-                        depth_info[i] = depth  # RealSense返回的就是米
-
-            # 左右翻转图像
-            frame = cv2.flip(frame, 1)
-            
-            # 调整检测框坐标以匹配翻转后的图像
-            for det in detections:
-                # 获取图像宽度
-                img_width = frame.shape[1]
-                # 翻转边界框坐标
-                x1, y1, x2, y2 = det['bbox']
-                det['bbox'] = (img_width - x2, y1, img_width - x1, y2)
-                # 翻转中心点坐标
-                center_x, center_y = det['center']
-                det['center'] = (img_width - center_x, center_y)
-
-            # 绘制检测结果
-            frame = detector.draw_detections(frame, detections, depth_info)
+            # 获取深度信息、翻转图像并绘制检测结果
+            frame, depth_info = annotate_frame(detector, camera, frame, detections)
 
             # 显示结果
             cv2.imshow("Object Detection", frame)
 
-            # 打印检测结果
-            for i, det in enumerate(detections):
-                depth_str = f", 深度: {depth_info[i]:.2f}m" if i in depth_info else ""
-                print(f"检测到物体: 类别={det['class_name']}, 置信度={det['confidence']:.2f}, "
-                      f"中心点=({det['center'][0]}, {det['center'][1]}){depth_str}")
+            # 输出检测结果（后台线程批量写出，不阻塞采集循环）
+            sink.emit(detections, depth_info)
 
-            # 按'q'退出
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # 按'q'退出，按'm'在PyTorch和ONNX模型之间热切换
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
+            if key == ord('m'):
+                next_path = model_paths[not detector.use_onnx]
+                if not os.path.exists(next_path):
+                    print(f"模型文件不存在: {next_path}")
+                elif detector.swap_model_async(next_path, frame_shapes=warmup_shapes, callback=on_model_swapped):
+                    print(f"正在后台加载模型 {next_path}")
 
     except Exception as e:
         print(f"发生错误: {str(e)}")
     finally:
         # 清理资源
         camera.stop()
+        sink.stop()
+        print(f"检测结果输出统计: {sink.stats}")
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
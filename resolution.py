@@ -0,0 +1,107 @@
+from typing import List, Optional, Sequence, Tuple
+
+
+class AdaptiveResolution:
+    """
+    自适应输入分辨率
+    根据检测耗时的滑动平均调整检测器的输入尺寸：超出帧时间预算时降低分辨率，
+    预计在更高分辨率下仍有余量时恢复分辨率。
+    """
+    def __init__(self, detector, sizes: Sequence[int] = (640, 512, 416, 320), target_fps: float = 30.0,
+                 smoothing: float = 0.1, headroom: float = 0.8, cooldown: int = 30):
+        """
+        初始化自适应分辨率策略
+        Args:
+            detector: YOLODetector对象，需支持动态输入尺寸
+            sizes: 可选的输入尺寸（最长边），必须是检测器步长的整数倍
+            target_fps: 目标帧率
+            smoothing: 耗时滑动平均的平滑系数
+            headroom: 升高分辨率时预计耗时需低于预算的比例
+            cooldown: 两次调整之间至少间隔的帧数
+        """
+        if not detector.dynamic:
+            raise ValueError(f"模型输入尺寸固定为 {detector.input_shape}，无法自适应调整分辨率")
+        self.detector = detector
+        self.sizes = sorted(sizes, reverse=True)
+        for size in self.sizes:
+            if size % detector.stride:
+                raise ValueError(f"输入尺寸 {size} 必须是步长 {detector.stride} 的整数倍")
+        self.budget_ms = 1000.0 / target_fps
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.cooldown = cooldown
+
+        # 从不超过当前输入尺寸的最大候选尺寸开始
+        current = max(detector.input_shape)
+        self.index = next((i for i, s in enumerate(self.sizes) if s <= current), len(self.sizes) - 1)
+        self.detector.set_img_size(self.sizes[self.index])
+        self.latency_ms = None
+        self.frames_since_change = 0
+
+    @property
+    def size(self) -> int:
+        """当前输入尺寸"""
+        return self.sizes[self.index]
+
+    def warmup(self, frame_shapes: Optional[List[Tuple[int, int]]] = None, iterations: int = 3):
+        """
+        依次在每个候选尺寸下预热检测器，避免切换尺寸后的第一帧变慢
+        Args:
+            frame_shapes: 模拟的输入帧尺寸(h, w)列表
+            iterations: 每个尺寸的预热次数
+        """
+        for size in self.sizes:
+            self.detector.set_img_size(size)
+            self.detector.warmup(frame_shapes, iterations)
+        self.detector.set_img_size(self.size)
+
+    def update(self, latency_ms: float) -> Optional[int]:
+        """
+        记录一帧的检测耗时，必要时调整输入尺寸
+        Args:
+            latency_ms: 本帧检测耗时（毫秒）
+        Returns:
+            调整后的输入尺寸，未调整时返回None
+        """
+        if not self.detector.dynamic:
+            # 热切换为固定输入尺寸的模型后不再调整
+            return None
+        self.resync()
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+        self.frames_since_change += 1
+        if self.frames_since_change < self.cooldown:
+            return None
+
+        if self.latency_ms > self.budget_ms and self.index < len(self.sizes) - 1:
+            return self._switch(self.index + 1)
+        if self.index > 0:
+            # 耗时近似与像素数成正比，预估更高分辨率下的耗时
+            larger = self.sizes[self.index - 1]
+            expected = self.latency_ms * (larger / self.size) ** 2
+            if expected < self.budget_ms * self.headroom:
+                return self._switch(self.index - 1)
+        return None
+
+    def resync(self) -> bool:
+        """
+        检测器的输入尺寸与当前策略尺寸不一致时（例如热切换模型后）重新应用策略尺寸
+        Returns:
+            是否重新设置了输入尺寸
+        """
+        if self.detector.input_shape == (self.size, self.size):
+            return False
+        return self.detector.try_set_img_size(self.size)
+
+    def _switch(self, index: int) -> Optional[int]:
+        # 检查动态形状后模型可能已被热切换为静态形状，此时不调整
+        if not self.detector.try_set_img_size(self.sizes[index]):
+            return None
+        old_size = self.size
+        self.index = index
+        # 新尺寸下的耗时按像素比例估算，避免旧的平均值立即触发再次调整
+        self.latency_ms *= (self.size / old_size) ** 2
+        self.frames_since_change = 0
+        return self.size
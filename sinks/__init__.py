@@ -0,0 +1,8 @@
+from .base import DetectionSink
+from .console_sink import ConsoleSink
+from .jsonl_sink import JsonLinesSink
+from .socket_sink import UdpSink, UnixSocketSink
+from .shm_sink import SharedMemoryRingSink, SharedMemoryRingReader
+
+__all__ = ['DetectionSink', 'ConsoleSink', 'JsonLinesSink', 'UdpSink', 'UnixSocketSink',
+           'SharedMemoryRingSink', 'SharedMemoryRingReader']
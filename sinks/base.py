@@ -0,0 +1,167 @@
+import time
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class DetectionSink(ABC):
+    """
+    检测事件输出基类
+    emit()只把事件放入有界队列，序列化和写出在后台线程中批量完成；
+    队列已满、超出速率限制或结果未变化时直接丢弃并计数，不会阻塞采集循环。
+    """
+    def __init__(self, max_queue: int = 1024, batch_size: int = 64, flush_interval: float = 0.05,
+                 max_rate: Optional[float] = None, change_only: bool = False, tolerance: int = 4):
+        """
+        初始化输出
+        Args:
+            max_queue: 队列最大长度
+            batch_size: 每批最多写出的事件数
+            flush_interval: 后台线程等待新事件的最长时间（秒）
+            max_rate: 每秒最多输出的事件数，为None时不限制
+            change_only: 是否只在检测结果变化时输出
+            tolerance: 判断结果是否变化时中心点坐标的容差（像素）
+        """
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.change_only = change_only
+        self.tolerance = max(int(tolerance), 1)
+        self.stats = {
+            'emitted': 0,        # 放入队列的事件数
+            'written': 0,        # 成功写出的事件数
+            'dropped_full': 0,   # 队列已满丢弃
+            'dropped_rate': 0,   # 超出速率限制丢弃
+            'unchanged': 0,      # 结果未变化跳过
+            'errors': 0,         # 写出失败的事件数
+            'abandoned': 0       # 停止时未能写出的事件数
+        }
+        self.is_running = False
+        self.thread = None
+        self._stop_event = threading.Event()
+        self._abandon_event = threading.Event()
+        self._last_emit = 0.0
+        self._last_signature = None
+        self._frame_id = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def open(self):
+        """打开输出目标，在后台线程启动前调用"""
+        pass
+
+    def close(self):
+        """关闭输出目标，在后台线程退出后调用"""
+        pass
+
+    @abstractmethod
+    def write_batch(self, events: List[Dict]) -> Optional[int]:
+        """在后台线程中写出一批事件，返回写出失败的事件数，全部成功时可返回None"""
+        pass
+
+    def start(self):
+        """启动后台写出线程"""
+        self.open()
+        self._stop_event.clear()
+        self._abandon_event.clear()
+        self.thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        self.is_running = True
+
+    def stop(self, timeout: float = 2.0):
+        """写出队列中剩余的事件并停止后台线程"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            # 写出线程仍在运行时关闭输出目标会导致其写入已关闭的文件/套接字/共享内存，
+            # 此时不关闭，让写出线程写完当前批次后退出，放弃队列中剩余的事件
+            self._abandon_event.set()
+            abandoned = self.queue.qsize()
+            self.stats['abandoned'] += abandoned
+            print(f"{type(self).__name__} 未能在 {timeout}s 内写完队列，放弃 {abandoned} 个事件")
+            return
+        self.close()
+
+    def emit(self, detections: List[Dict], depth_info: Optional[Dict] = None) -> bool:
+        """
+        输出一帧的检测结果，不阻塞
+        Args:
+            detections: 检测结果列表
+            depth_info: 深度信息字典，键为检测索引，值为深度值（米）
+        Returns:
+            事件是否放入队列
+        """
+        self._frame_id += 1
+        if not self.is_running:
+            return False
+
+        if self.change_only:
+            signature = self._signature(detections)
+            if signature == self._last_signature:
+                self.stats['unchanged'] += 1
+                return False
+
+        now = time.time()
+        if self.min_interval and now - self._last_emit < self.min_interval:
+            self.stats['dropped_rate'] += 1
+            return False
+
+        objects = []
+        for i, det in enumerate(detections):
+            obj = {
+                'class': det['class'],
+                'class_name': det['class_name'],
+                'confidence': round(det['confidence'], 4),
+                'bbox': det['bbox'],
+                'center': det['center']
+            }
+            if depth_info and i in depth_info:
+                obj['depth'] = round(depth_info[i], 4)
+            objects.append(obj)
+        event = {'frame': self._frame_id, 'timestamp': now, 'detections': objects}
+
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.stats['dropped_full'] += 1
+            return False
+        self._last_emit = now
+        if self.change_only:
+            self._last_signature = signature
+        self.stats['emitted'] += 1
+        return True
+
+    def _signature(self, detections: List[Dict]):
+        """按类别和量化后的中心点生成结果签名，用于判断结果是否变化"""
+        q = self.tolerance
+        return tuple(sorted((det['class'], det['center'][0] // q, det['center'][1] // q) for det in detections))
+
+    def _run(self):
+        """后台线程：批量取出事件并写出"""
+        while not self._abandon_event.is_set():
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    failed = self.write_batch(batch) or 0
+                    self.stats['written'] += len(batch) - failed
+                    self.stats['errors'] += failed
+                except Exception:
+                    self.stats['errors'] += len(batch)
+            elif self._stop_event.is_set():
+                break
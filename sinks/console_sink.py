@@ -0,0 +1,29 @@
+import sys
+from typing import Dict, List
+from .base import DetectionSink
+
+
+class ConsoleSink(DetectionSink):
+    """控制台输出类，在后台线程中批量打印检测结果"""
+    def __init__(self, stream=None, **kwargs):
+        """
+        初始化控制台输出
+        Args:
+            stream: 输出流，默认为标准输出
+            **kwargs: 传给DetectionSink的参数
+        """
+        super().__init__(**kwargs)
+        self.stream = stream
+
+    def write_batch(self, events: List[Dict]):
+        """一次写入一批事件的全部文本"""
+        lines = []
+        for event in events:
+            for obj in event['detections']:
+                depth_str = f", 深度: {obj['depth']:.2f}m" if 'depth' in obj else ""
+                lines.append(f"检测到物体: 类别={obj['class_name']}, 置信度={obj['confidence']:.2f}, "
+                             f"中心点=({obj['center'][0]}, {obj['center'][1]}){depth_str}\n")
+        if lines:
+            stream = self.stream or sys.stdout
+            stream.write(''.join(lines))
+            stream.flush()
@@ -0,0 +1,33 @@
+import json
+from typing import Dict, List
+from .base import DetectionSink
+
+
+class JsonLinesSink(DetectionSink):
+    """JSON Lines文件输出类，每个事件一行"""
+    def __init__(self, path: str, **kwargs):
+        """
+        初始化JSON Lines输出
+        Args:
+            path: 输出文件路径，以追加方式写入
+            **kwargs: 传给DetectionSink的参数
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.file = None
+
+    def open(self):
+        """打开输出文件"""
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        """关闭输出文件"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def write_batch(self, events: List[Dict]):
+        """一批事件合并为一次写入"""
+        self.file.write(''.join(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                for event in events))
+        self.file.flush()
@@ -0,0 +1,119 @@
+import json
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+from .base import DetectionSink
+
+# 共享内存布局：
+#   头部：最新写入的序号、槽位数、槽位大小
+#   槽位：序号、数据长度、JSON数据
+# 写入时先将槽位序号置0，写完数据后再写入序号，读取方据此判断槽位是否正在写或已被覆盖
+RING_HEADER = struct.Struct('<QII')
+SLOT_HEADER = struct.Struct('<QI')
+
+
+class SharedMemoryRingSink(DetectionSink):
+    """共享内存环形缓冲区输出类，写满后覆盖最旧的事件"""
+    def __init__(self, name: str = 'yolo_detections', slots: int = 256, slot_size: int = 4096, **kwargs):
+        """
+        初始化共享内存输出
+        Args:
+            name: 共享内存名称，读取方通过该名称连接
+            slots: 槽位数
+            slot_size: 每个槽位的字节数（含槽位头部），超出的事件会被丢弃并计为错误
+            **kwargs: 传给DetectionSink的参数
+        """
+        super().__init__(**kwargs)
+        self.name = name
+        self.slots = slots
+        self.slot_size = slot_size
+        self.shm = None
+        self.seq = 0
+
+    def open(self):
+        """创建共享内存"""
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True,
+                                              size=RING_HEADER.size + self.slots * self.slot_size)
+        self.seq = 0
+        RING_HEADER.pack_into(self.shm.buf, 0, 0, self.slots, self.slot_size)
+
+    def close(self):
+        """释放共享内存"""
+        if self.shm is not None:
+            self.shm.close()
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                # 已被其他进程删除
+                pass
+            self.shm = None
+
+    def write_batch(self, events: List[Dict]) -> int:
+        """逐个写入槽位，写完一个事件后更新头部的最新序号"""
+        failed = 0
+        buf = self.shm.buf
+        max_payload = self.slot_size - SLOT_HEADER.size
+        for event in events:
+            data = json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            if len(data) > max_payload:
+                failed += 1
+                continue
+            self.seq += 1
+            offset = RING_HEADER.size + (self.seq - 1) % self.slots * self.slot_size
+            SLOT_HEADER.pack_into(buf, offset, 0, 0)
+            buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(data)] = data
+            SLOT_HEADER.pack_into(buf, offset, self.seq, len(data))
+            struct.pack_into('<Q', buf, 0, self.seq)
+        return failed
+
+
+class SharedMemoryRingReader:
+    """共享内存环形缓冲区读取类，供其他进程读取SharedMemoryRingSink输出的事件"""
+    def __init__(self, name: str = 'yolo_detections'):
+        """
+        连接共享内存
+        Args:
+            name: 共享内存名称
+        """
+        self.shm = shared_memory.SharedMemory(name=name)
+        # 连接时共享内存会登记到本进程的resource_tracker，本进程退出时会将其删除，
+        # 而共享内存归写入方所有，因此取消登记
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        latest, self.slots, self.slot_size = RING_HEADER.unpack_from(self.shm.buf, 0)
+        # 从缓冲区中仍保留的最旧事件开始读取
+        self.last_seq = max(0, latest - self.slots)
+        # 读取过慢被覆盖的事件数
+        self.lost = 0
+
+    def read(self, max_events: Optional[int] = None) -> List[Dict]:
+        """
+        读取上次读取之后的新事件
+        Args:
+            max_events: 最多读取的事件数
+        Returns:
+            事件列表
+        """
+        buf = self.shm.buf
+        latest = struct.unpack_from('<Q', buf, 0)[0]
+        # 只有最近slots个事件可能仍在缓冲区中
+        first = max(self.last_seq + 1, latest - self.slots + 1)
+        self.lost += first - (self.last_seq + 1)
+        if max_events is not None:
+            latest = min(latest, first + max_events - 1)
+
+        events = []
+        for seq in range(first, latest + 1):
+            offset = RING_HEADER.size + (seq - 1) % self.slots * self.slot_size
+            slot_seq, length = SLOT_HEADER.unpack_from(buf, offset)
+            data = bytes(buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length])
+            # 拷贝后序号不变才说明读取期间未被覆盖
+            if slot_seq != seq or SLOT_HEADER.unpack_from(buf, offset)[0] != seq:
+                self.lost += 1
+                continue
+            events.append(json.loads(data))
+        self.last_seq = max(self.last_seq, latest)
+        return events
+
+    def close(self):
+        """断开共享内存连接"""
+        self.shm.close()
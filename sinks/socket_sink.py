@@ -0,0 +1,73 @@
+import json
+import socket
+from typing import Dict, List
+from .base import DetectionSink
+
+
+class DatagramSink(DetectionSink):
+    """数据报套接字输出基类，每个事件作为一个JSON数据报发送"""
+    family = socket.AF_INET
+
+    def __init__(self, address, **kwargs):
+        """
+        初始化数据报输出
+        Args:
+            address: 目标地址
+            **kwargs: 传给DetectionSink的参数
+        """
+        super().__init__(**kwargs)
+        self.address = address
+        self.sock = None
+
+    def open(self):
+        """创建非阻塞套接字"""
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def close(self):
+        """关闭套接字"""
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def write_batch(self, events: List[Dict]):
+        """逐个发送事件，接收端不可用或缓冲区已满时丢弃并计数"""
+        failed = 0
+        for event in events:
+            data = json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            try:
+                self.sock.sendto(data, self.address)
+            except OSError:
+                failed += 1
+        return failed
+
+
+class UdpSink(DatagramSink):
+    """UDP输出类"""
+    family = socket.AF_INET
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9999, **kwargs):
+        """
+        初始化UDP输出
+        Args:
+            host: 目标主机
+            port: 目标端口
+            **kwargs: 传给DetectionSink的参数
+        """
+        super().__init__((host, port), **kwargs)
+
+
+class UnixSocketSink(DatagramSink):
+    """Unix数据报套接字输出类（仅Linux/Mac）"""
+    family = getattr(socket, 'AF_UNIX', None)
+
+    def __init__(self, path: str, **kwargs):
+        """
+        初始化Unix套接字输出
+        Args:
+            path: 接收端套接字路径
+            **kwargs: 传给DetectionSink的参数
+        """
+        if self.family is None:
+            raise Exception("当前平台不支持Unix套接字")
+        super().__init__(path, **kwargs)
@@ -10,15 +10,16 @@ import numpy as np
 import cv2
 
 
-def letterbox(img, new_shape=(640, 640), auto=False, scaleFill=False, scaleUp=True):
+def letterbox(img, new_shape=(640, 640), auto=False, scaleFill=False, scaleUp=True, stride=64):
     """
     python的信封图片缩放
     :param img: 原图
     :param new_shape: 缩放后的图片
     :param color: 填充的颜色
-    :param auto: 是否为自动
+    :param auto: 是否为自动，只填充到stride的整数倍（矩形输入）
     :param scaleFill: 填充
     :param scaleUp: 向上填充
+    :param stride: 自动模式下的对齐步长
     :return:
     """
     shape = img.shape[:2]  # current shape[height,width]
@@ -31,7 +32,7 @@ def letterbox(img, new_shape=(640, 640), auto=False, scaleFill=False, scaleUp=Tr
     new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
     dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
     if auto:
-        dw, dh = np.mod(dw, 64), np.mod(dh, 64)
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
     elif scaleFill:
         dw, dh = 0.0, 0.0
         new_unpad = (new_shape[1], new_shape[0])
@@ -81,3 +82,51 @@ def scale_coords(img1_shape, coords, img0_shape, ratio_pad=None):
     coords[:, :4] /= gain
     clip_coords(coords, img0_shape)
     return coords
+
+
+def box_iou(box1, box2):
+    """
+    计算两组框两两之间的IoU
+    :param box1: 检测框 (N, 4)，格式为x1y1x2y2
+    :param box2: 检测框 (M, 4)，格式为x1y1x2y2
+    :return: IoU矩阵 (N, M)
+    """
+    lt = np.maximum(box1[:, None, :2], box2[None, :, :2])  # 交集左上角
+    rb = np.minimum(box1[:, None, 2:4], box2[None, :, 2:4])  # 交集右下角
+    inter = np.clip(rb - lt, 0, None).prod(2)
+    area1 = (box1[:, 2] - box1[:, 0]) * (box1[:, 3] - box1[:, 1])
+    area2 = (box2[:, 2] - box2[:, 0]) * (box2[:, 3] - box2[:, 1])
+    return inter / (area1[:, None] + area2[None, :] - inter + 1e-9)
+
+
+def xywhn2xyxy(x, w=640, h=640):
+    """
+    归一化的中心点宽高坐标转换为像素坐标x1y1x2y2
+    :param x: 标签坐标 (N, 4)
+    :param w: 图片宽度
+    :param h: 图片高度
+    :return:
+    """
+    y = np.copy(x)
+    y[:, 0] = w * (x[:, 0] - x[:, 2] / 2)
+    y[:, 1] = h * (x[:, 1] - x[:, 3] / 2)
+    y[:, 2] = w * (x[:, 0] + x[:, 2] / 2)
+    y[:, 3] = h * (x[:, 1] + x[:, 3] / 2)
+    return y
+
+
+def summarize(samples):
+    """
+    统计耗时样本
+    :param samples: 耗时样本（毫秒）列表
+    :return: 平均值、p50、p95和最大值
+    """
+    if not len(samples):
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    samples = np.asarray(samples)
+    return {
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'max': float(samples.max())
+    }